@@ -3,13 +3,21 @@ import tempfile
 import subprocess
 import shutil
 from pathlib import Path
-from dotenv import load_dotenv
-from pdf_translator import PDFTranslator
+from pdf_translator import PDFTranslator, get_translator
+from translation_backends import backend_identity, backends_configured
+from scheduler import get_scheduler
+from concurrency import get_controller
+from result_cache import ResultCache
+from extraction_backends import get_extraction_backend
+from ocr import DEFAULT_OCR_LANGUAGES, ocr_available
+from glossary import Glossary
+from preflight import analyze_document, assess
+from profiling import JobProfiler
+# 引擎与转换能力检测、.env加载在模块中按进程缓存，页面重跑时不再重复检测
+from capabilities import detect_docx_converters, find_pdf2zh, load_env
 import streamlit as st
-import sys
-
-# 加载.env文件
-load_dotenv()
+import uuid
+import hashlib
 
 # 页面配置
 st.set_page_config(
@@ -18,16 +26,23 @@ st.set_page_config(
     layout="centered"
 )
 
+# 加载.env文件（进程内只加载一次）
+load_env()
+
 # 标题
 st.title("📄 中软国际GBU 文档翻译工具")
 st.markdown("---")
 
-# 检查API密钥
-api_key = os.getenv('DEEPSEEK_API_KEY')
+# 检查API密钥（或已配置的翻译后端池）
+api_key = backends_configured()
 if not api_key:
-    st.error("⚠️ 请在.env文件中配置DEEPSEEK_API_KEY")
+    st.error("⚠️ 请在.env文件中配置DEEPSEEK_API_KEY或TRANSLATION_BACKENDS")
     st.stop()
 
+# 会话标识：调度器按会话区分任务归属
+if 'user_id' not in st.session_state:
+    st.session_state['user_id'] = uuid.uuid4().hex
+
 # 文件上传
 st.subheader("📤 上传文档")
 uploaded_file = st.file_uploader(
@@ -55,21 +70,39 @@ lang_code_map = {
 }
 lang_code = lang_code_map.get(target_language, "zh")
 
+# 多语言批量输出：一次提取，并发翻译为多种语言，结果打包为zip
+multi_language = st.checkbox("🌍 多语言批量输出", value=False, help="选中后，一次上传同时翻译为多种语言，结果打包为zip下载")
+target_languages = []
+if multi_language:
+    target_languages = st.multiselect("目标语言（可多选）", list(lang_code_map.keys()), default=list(lang_code_map.keys()))
+
+# 术语表：只把段落中出现的术语加入翻译提示词
+glossary_file = st.file_uploader(
+    "📚 术语表（可选）",
+    type=['csv', 'tsv', 'txt'],
+    help="每行：原文,译文[,目标语言]；目标语言可填代码（如 en）或名称（如 英语），留空表示适用于所有语言；翻译时只附带当前段落中出现的术语"
+)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load_glossary(data: bytes, name: str):
+    return Glossary.from_bytes(data, name, languages=lang_code_map)
+
+glossary = None
+glossary_digest = None
+if glossary_file is not None:
+    try:
+        glossary_data = glossary_file.getvalue()
+        glossary = _load_glossary(glossary_data, glossary_file.name)
+        glossary_digest = hashlib.sha256(glossary_data).hexdigest()
+        st.caption(f"已加载 {len(glossary)} 条术语")
+    except Exception as e:
+        st.error(f"❌ 术语表解析失败: {str(e)}")
+
 # 添加对照翻译选项
 show_comparison = st.checkbox("📋 显示原文和译文对照", value=True, help="选中后，输出的文档将同时显示原文和译文，方便对比检查翻译质量")
 preserve_layout = st.checkbox("🧩 保持原版式排版", value=True, help="对PDF使用保版式引擎生成译文；DOCX将先转换为PDF后处理")
-
-def _find_pdf2zh():
-    local_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'pdf2zh', 'pdf2zh.exe')
-    if os.path.exists(local_path):
-        return local_path
-    venv_path = os.path.join(sys.prefix, 'Scripts', 'pdf2zh.exe')
-    if os.path.exists(venv_path):
-        return venv_path
-    cmd = shutil.which('pdf2zh')
-    if cmd:
-        return cmd
-    return None
+profile_job = st.checkbox("🔬 性能分析", value=False, help="记录本次任务的耗时分布（cProfile、speedscope火焰图）和内存分配，完成后可下载分析结果；开启后不复用缓存结果")
+trace_allocations = profile_job and st.checkbox("记录内存分配", value=True, help="使用tracemalloc统计分配位置，分配密集的步骤会明显变慢")
 
 if uploaded_file is not None:
     # 显示文件信息
@@ -93,9 +126,76 @@ if uploaded_file is not None:
     if preserve_layout:
         output_suffix = '.pdf'
         mime_type = "application/pdf"
-    
+
+    # 预检：只读取文档结构，在开始前估算调用量、费用、耗时和内存
+    @st.cache_data(show_spinner=False, max_entries=16)
+    def _preflight(data: bytes, file_type: str, num_languages: int):
+        report = analyze_document(data, file_type, num_languages=num_languages)
+        level, messages = assess(report)
+        return report.to_dict(), level, messages
+
+    preflight_level = 'ok'
+    try:
+        num_languages = len(target_languages) if multi_language else 1
+        preflight, preflight_level, preflight_messages = _preflight(uploaded_file.getvalue(), file_type, max(num_languages, 1))
+        with st.expander("🔎 预检结果", expanded=preflight_level != 'ok'):
+            st.markdown(
+                f"- 页数：{preflight['pages']}（扫描页 {preflight['scanned_pages']}，表格页 {preflight['table_pages']}）\n"
+                f"- 字数：约 {preflight['chars']}，token：约 {preflight['tokens']}\n"
+                f"- API调用：约 {preflight['api_calls']} 次，费用：约 {preflight['cost']:.2f} 元\n"
+                f"- 耗时：约 {preflight['seconds'] / 60:.1f} 分钟，峰值内存：约 {preflight['peak_memory_mb']:.0f} MB"
+            )
+        if preflight_level == 'reject':
+            st.error("❌ 文档超出处理上限：" + "；".join(preflight_messages))
+        elif preflight_level == 'warn':
+            st.warning("⚠️ " + "；".join(preflight_messages))
+    except Exception as e:
+        st.warning(f"预检失败，将直接翻译: {str(e)}")
+
     # 翻译按钮
-    if st.button("🚀 开始翻译", type="primary"):
+    start_clicked = st.button("🚀 开始翻译", type="primary", disabled=preflight_level == 'reject')
+    cached_result = None
+    if start_clicked:
+        # 结果缓存：相同文件、相同选项和相同后端配置直接返回已生成的结果；只在点击后计算键，避免每次重跑都哈希文件
+        result_cache = ResultCache()
+        use_layout_engine = preserve_layout and not multi_language
+        cache_key = ResultCache.make_key(
+            uploaded_file.getvalue(),
+            file_type=file_type,
+            languages=target_languages if multi_language else [target_language],
+            show_comparison=show_comparison,
+            preserve_layout=use_layout_engine,
+            engine=PDFTranslator.ENGINE_VERSION,
+            glossary=glossary_digest,
+            layout_engine=(find_pdf2zh() or 'pdf2zh') if use_layout_engine else None,
+            # 保版式引擎不经过翻译后端，后端配置只影响普通翻译流程
+            backends=None if use_layout_engine else backend_identity(),
+            # PDF的提取后端和OCR可用性决定扫描页是否被识别：未安装Tesseract时跳过的页面，安装后不应继续命中
+            extraction={
+                'backend': get_extraction_backend().name,
+                'ocr': ocr_available(),
+                'ocr_languages': os.getenv('OCR_LANGUAGES', DEFAULT_OCR_LANGUAGES),
+            } if file_type == 'pdf' and not use_layout_engine else None
+        )
+        # 性能分析需要实际执行任务，不复用缓存结果
+        if not profile_job:
+            cached_result = result_cache.get(cache_key)
+    if cached_result:
+        cached_doc, cached_meta = cached_result
+        st.success("✅ 翻译完成！（已复用相同文件和选项的翻译结果）")
+        st.download_button(
+            label="📥 下载翻译结果",
+            data=cached_doc,
+            file_name=cached_meta.get('file_name', f"translated_{uploaded_file.name}"),
+            mime=cached_meta.get('mime', mime_type)
+        )
+    elif start_clicked:
+        scheduler = get_scheduler()
+        job_id = scheduler.register_job(owner=st.session_state['user_id'])
+        # 点击后页面重跑，运行中的任务在轮询进度时被中断并取消排队中的请求
+        st.button("⏹️ 取消翻译", key="cancel_job")
+        # 性能分析覆盖整个任务，包括保版式引擎分支的格式转换、pdf2zh调用和回退流程
+        profiler = JobProfiler(trace_allocations=trace_allocations).start() if profile_job else None
         try:
             progress = st.progress(0)
             status = st.empty()
@@ -107,7 +207,50 @@ if uploaded_file is not None:
                 temp_path = temp_file.name
             progress.progress(0.1)
 
-            if preserve_layout:
+            if multi_language:
+                if not target_languages:
+                    st.warning("请至少选择一种目标语言")
+                    st.stop()
+                if preserve_layout:
+                    st.info("多语言批量输出使用普通翻译流程生成各语言文档")
+                status.text(f"正在翻译为 {len(target_languages)} 种语言...")
+                output_path = tempfile.mktemp(suffix='.zip')
+                translator = get_translator()
+                translator.translate_document(
+                    temp_path,
+                    output_path,
+                    target_languages,
+                    show_comparison=show_comparison,
+                    file_type=file_type,
+                    job_id=job_id,
+                    glossary=glossary
+                )
+                with open(output_path, 'rb') as file:
+                    translated_doc = file.read()
+                progress.progress(0.95)
+                st.success("✅ 翻译完成！")
+                st.download_button(
+                    label="📥 下载多语言翻译结果",
+                    data=translated_doc,
+                    file_name=f"translated_{Path(uploaded_file.name).stem}.zip",
+                    mime="application/zip"
+                )
+                result_cache.put(cache_key, translated_doc, {
+                    'file_name': f"translated_{Path(uploaded_file.name).stem}.zip",
+                    'mime': "application/zip"
+                })
+                progress.progress(1.0)
+                try:
+                    os.unlink(temp_path)
+                except Exception:
+                    pass
+                try:
+                    os.unlink(output_path)
+                except Exception:
+                    pass
+            elif preserve_layout:
+                if glossary is not None:
+                    st.warning("⚠️ 保版式引擎不支持术语表，本次译文未应用术语表；如需使用术语表，请取消勾选“保持原版式排版”")
                 input_pdf_path = None
                 cleanup_paths = []
                 if file_type == 'pdf':
@@ -117,13 +260,15 @@ if uploaded_file is not None:
                     pdf_temp_dir = tempfile.mkdtemp()
                     pdf_temp_path = os.path.join(pdf_temp_dir, f"{Path(uploaded_file.name).stem}.pdf")
                     converted = False
-                    try:
-                        from docx2pdf import convert as docx2pdf_convert
-                        docx2pdf_convert(temp_path, pdf_temp_path)
-                        converted = os.path.exists(pdf_temp_path)
-                    except Exception:
-                        pass
-                    if not converted:
+                    converters = detect_docx_converters()
+                    if converters['docx2pdf']:
+                        try:
+                            from docx2pdf import convert as docx2pdf_convert
+                            docx2pdf_convert(temp_path, pdf_temp_path)
+                            converted = os.path.exists(pdf_temp_path)
+                        except Exception:
+                            pass
+                    if not converted and converters['word_com']:
                         try:
                             import win32com.client as win32
                             word = win32.DispatchEx('Word.Application')
@@ -135,7 +280,7 @@ if uploaded_file is not None:
                         except Exception:
                             pass
                     if not converted:
-                        soffice = shutil.which('soffice') or shutil.which('libreoffice')
+                        soffice = converters['soffice']
                         if soffice:
                             try:
                                 r = subprocess.run([soffice, '--headless', '--convert-to', 'pdf', '--outdir', pdf_temp_dir, temp_path], capture_output=True, text=True)
@@ -153,7 +298,7 @@ if uploaded_file is not None:
                         st.warning("DOCX转换为PDF失败，已回退为普通翻译输出")
                 if input_pdf_path:
                     out_dir = tempfile.mkdtemp()
-                    pdf2zh_cmd = _find_pdf2zh() or 'pdf2zh'
+                    pdf2zh_cmd = find_pdf2zh() or 'pdf2zh'
                     run_cmd = [pdf2zh_cmd, input_pdf_path, '-lo', lang_code, '-o', out_dir]
                     try:
                         status.text("正在使用保版式引擎翻译...")
@@ -179,6 +324,7 @@ if uploaded_file is not None:
                                 st.success("✅ 翻译完成！")
                                 dl_name = f"translated_{Path(uploaded_file.name).stem}.pdf"
                                 st.download_button(label="📥 下载翻译结果", data=translated_doc, file_name=dl_name, mime="application/pdf")
+                                result_cache.put(cache_key, translated_doc, {'file_name': dl_name, 'mime': "application/pdf"})
                                 cleanup_paths.append(chosen_path)
                                 progress.progress(1.0)
                             else:
@@ -195,14 +341,15 @@ if uploaded_file is not None:
                 if not input_pdf_path or 'translated_doc' not in locals():
                     status.text("正在回退到普通翻译流程...")
                     output_path = tempfile.mktemp(suffix=('.pdf' if file_type == 'pdf' else '.docx'))
-                    translator = PDFTranslator()
-                    translator.translate_document(temp_path, output_path, target_language, show_comparison=show_comparison, file_type=file_type)
+                    translator = get_translator()
+                    translator.translate_document(temp_path, output_path, target_language, show_comparison=show_comparison, file_type=file_type, job_id=job_id, glossary=glossary)
                     with open(output_path, 'rb') as file:
                         translated_doc = file.read()
                     progress.progress(0.95)
                     st.success("✅ 翻译完成！")
                     dl_name = f"translated_{uploaded_file.name}"
                     st.download_button(label="📥 下载翻译结果", data=translated_doc, file_name=dl_name, mime=("application/pdf" if file_type == 'pdf' else "application/vnd.openxmlformats-officedocument.wordprocessingml.document"))
+                    # 保版式失败后的回退结果不写入缓存，以免引擎恢复后仍返回回退结果
                     try:
                         os.unlink(output_path)
                     except Exception:
@@ -224,13 +371,15 @@ if uploaded_file is not None:
             else:
                 status.text("正在进行普通翻译...")
                 output_path = tempfile.mktemp(suffix=output_suffix)
-                translator = PDFTranslator()
+                translator = get_translator()
                 translator.translate_document(
                     temp_path,
                     output_path,
                     target_language,
                     show_comparison=show_comparison,
-                    file_type=file_type
+                    file_type=file_type,
+                    job_id=job_id,
+                    glossary=glossary
                 )
                 with open(output_path, 'rb') as file:
                     translated_doc = file.read()
@@ -242,6 +391,7 @@ if uploaded_file is not None:
                     file_name=f"translated_{uploaded_file.name}",
                     mime=mime_type
                 )
+                result_cache.put(cache_key, translated_doc, {'file_name': f"translated_{uploaded_file.name}", 'mime': mime_type})
                 progress.progress(1.0)
                 try:
                     os.unlink(temp_path)
@@ -254,6 +404,33 @@ if uploaded_file is not None:
 
         except Exception as e:
             st.error(f"❌ 翻译失败: {str(e)}")
+        finally:
+            if profiler:
+                profiler.stop()
+            scheduler.finish_job(job_id)
+
+        # 并发控制器状态（进程级，含其他会话的请求）
+        metrics = get_controller().snapshot()
+        with st.expander("📈 并发控制状态"):
+            p50 = f"{metrics['p50']:.2f}s" if metrics['p50'] is not None else '-'
+            p95 = f"{metrics['p95']:.2f}s" if metrics['p95'] is not None else '-'
+            outcomes = metrics['outcomes']
+            st.markdown(
+                f"- 并发上限：{metrics['limit']}（范围 {metrics['min_limit']}–{metrics['max_limit']}）\n"
+                f"- 延迟：p50 {p50}，p95 {p95}\n"
+                f"- 请求：{metrics['requests']} 次，限流 {outcomes['rate_limited']}，超时 {outcomes['timeout']}，"
+                f"其他错误 {outcomes['error']}\n"
+                f"- 对冲请求：{metrics['hedges']} 次，其中 {metrics['hedge_wins']} 次先于原请求返回"
+            )
+        if profiler:
+            # 任务失败时同样提供分析结果，便于定位问题文档的瓶颈
+            st.download_button(
+                label=f"🔬 下载性能分析结果（耗时 {profiler.elapsed:.1f}s）",
+                data=profiler.to_zip(uploaded_file.name),
+                file_name=f"profile_{Path(uploaded_file.name).stem}.zip",
+                mime="application/zip",
+                help="包含 profile.pstats、profile.txt、speedscope.json（可在 speedscope.app 打开）和 allocations.txt"
+            )
 
 # 侧边栏信息
 with st.sidebar:
@@ -277,17 +454,11 @@ with st.sidebar:
     st.markdown("**使用语言:** 中文、英语、日语、韩语、印度尼西亚语、泰语、阿拉伯语、马来语")
     st.markdown("---")
     st.header("🧩 保版式引擎状态")
-    engine_path = _find_pdf2zh()
+    engine_path = find_pdf2zh()
     if engine_path:
         st.success(f"已检测到保版式引擎: {engine_path}")
     else:
         st.warning("未检测到保版式引擎（pdf2zh）")
     # 转换能力检测
-    has_docx2pdf = False
-    try:
-        import docx2pdf  # noqa: F401
-        has_docx2pdf = True
-    except Exception:
-        has_docx2pdf = False
-    soffice = shutil.which('soffice') or shutil.which('libreoffice')
-    st.caption(f"DOCX→PDF: docx2pdf={'✅' if has_docx2pdf else '❌'}, Word COM={'✅' if os.name=='nt' else '❌'}, LibreOffice={'✅' if bool(soffice) else '❌'}")
\ No newline at end of file
+    converters = detect_docx_converters()
+    st.caption(f"DOCX→PDF: docx2pdf={'✅' if converters['docx2pdf'] else '❌'}, Word COM={'✅' if converters['word_com'] else '❌'}, LibreOffice={'✅' if bool(converters['soffice']) else '❌'}")
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""PDF提取后端基准测试：统计各后端在样本语料上的每页耗时
+
+用法：python benchmarks/bench_extraction.py <PDF文件或目录> [--repeat 3]
+      python benchmarks/bench_extraction.py --generate 200 [--repeat 3]
+--generate 生成合成语料（英文正文页、中文正文页、带网格线的表格页各占三分之一）代替真实文件。
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction_backends import EXTRACTION_BACKENDS  # noqa: E402
+
+
+def collect_pdfs(paths):
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                pdfs.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith('.pdf'))
+        else:
+            pdfs.append(path)
+    return pdfs
+
+
+def generate_corpus(directory: str, pages: int, seed: int = 0):
+    """用reportlab生成三份合成PDF：英文正文、中文正文（STSong-Light）和表格页"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+
+    pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9))) for _ in range(2000)]
+    cjk = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+    width, height = A4
+    per_file = max(1, pages // 3)
+
+    def build(name, draw_page):
+        c = canvas.Canvas(os.path.join(directory, name), pagesize=A4)
+        for _ in range(per_file):
+            draw_page(c)
+            c.showPage()
+        c.save()
+
+    def english(c):
+        c.setFont('Helvetica', 10)
+        for line in range(60):
+            c.drawString(50, height - 50 - line * 12, ' '.join(rng.choice(words) for _ in range(14)))
+
+    def chinese(c):
+        c.setFont('STSong-Light', 10)
+        for line in range(55):
+            c.drawString(50, height - 50 - line * 13, ''.join(rng.choice(cjk) for _ in range(45)))
+
+    def table(c):
+        c.setFont('Helvetica', 9)
+        rows, cols, top, left, cell_w, cell_h = 30, 6, height - 60, 50, 80, 22
+        for r in range(rows + 1):
+            c.line(left, top - r * cell_h, left + cols * cell_w, top - r * cell_h)
+        for col in range(cols + 1):
+            c.line(left + col * cell_w, top, left + col * cell_w, top - rows * cell_h)
+        for r in range(rows):
+            for col in range(cols):
+                c.drawString(left + col * cell_w + 4, top - r * cell_h - 15, rng.choice(words))
+
+    build('english.pdf', english)
+    build('chinese.pdf', chinese)
+    build('tables.pdf', table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较PDF提取后端的每页耗时')
+    parser.add_argument('paths', nargs='*', help='PDF文件或包含PDF的目录')
+    parser.add_argument('--repeat', type=int, default=3, help='每个文件重复次数，取最快一次')
+    parser.add_argument('--generate', type=int, default=0, help='生成指定总页数的合成语料代替 paths')
+    args = parser.parse_args()
+
+    corpus_dir = None
+    if args.generate:
+        corpus_dir = tempfile.mkdtemp()
+        generate_corpus(corpus_dir, args.generate)
+        args.paths = [corpus_dir]
+    try:
+        run(args.paths, args.repeat)
+    finally:
+        if corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+def run(paths, repeat: int):
+    pdfs = collect_pdfs(paths)
+    if not pdfs:
+        print('未找到PDF文件')
+        return
+
+    print(f"{'后端':<12}{'页数':>8}{'总耗时(s)':>12}{'每页(ms)':>12}{'表格页':>8}")
+    for name, backend_cls in EXTRACTION_BACKENDS.items():
+        backend = backend_cls()
+        total_pages = total_time = table_pages = 0
+        try:
+            for pdf_path in pdfs:
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    pages = backend.extract(pdf_path)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                total_pages += len(pages)
+                total_time += best
+                table_pages += sum(1 for _, _, tables, _ in pages if tables)
+        except ImportError as e:
+            print(f"{name:<12}不可用：{e}")
+            continue
+        per_page = total_time / total_pages * 1000 if total_pages else 0
+        print(f"{name:<12}{total_pages:>8}{total_time:>12.2f}{per_page:>12.1f}{table_pages:>8}")
+
+
+if __name__ == '__main__':
+    main()
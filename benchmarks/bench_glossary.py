@@ -0,0 +1,74 @@
+"""术语匹配基准测试：大术语表对长文档逐段匹配的耗时
+
+默认生成 3 万条术语（英文词组与中文词各半）和约 200 万字符的文本（约 500 页），按段落调用 Glossary.match。
+
+用法：python benchmarks/bench_glossary.py [--terms 30000] [--chars 2000000] [--paragraph 500] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from glossary import Glossary  # noqa: E402
+
+LATIN = 'abcdefghijklmnopqrstuvwxyz'
+CJK = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+
+
+def _word(rng: random.Random) -> str:
+    return ''.join(rng.choice(LATIN) for _ in range(rng.randint(3, 9)))
+
+
+def build(terms: int, chars: int, paragraph: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocabulary = [_word(rng) for _ in range(5000)]
+    entries = []
+    for i in range(terms):
+        if i % 2:
+            source = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 3)))
+        else:
+            source = ''.join(rng.choice(CJK) for _ in range(rng.randint(2, 4)))
+        entries.append((source, f"T{i}", ''))
+    paragraphs = []
+    total = 0
+    while total < chars:
+        if rng.random() < 0.5:
+            words = []
+            while sum(len(w) + 1 for w in words) < paragraph:
+                words.append(rng.choice(vocabulary).capitalize() if rng.random() < 0.1 else rng.choice(vocabulary))
+            text = ' '.join(words) + '.'
+        else:
+            text = ''.join(rng.choice(CJK) for _ in range(paragraph // 2))
+        paragraphs.append(text)
+        total += len(text)
+    return Glossary(entries), paragraphs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量术语匹配耗时')
+    parser.add_argument('--terms', type=int, default=30000, help='术语条数')
+    parser.add_argument('--chars', type=int, default=2000000, help='文本总字符数')
+    parser.add_argument('--paragraph', type=int, default=500, help='段落长度（字符）')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取中位数')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    glossary, paragraphs = build(args.terms, args.chars, args.paragraph)
+    print(f"术语 {len(glossary)} 条，段落 {len(paragraphs)} 个，构建耗时 {time.perf_counter() - start:.2f}s")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        hits = sum(len(glossary.match(text, 'en')) for text in paragraphs)
+        timings.append(time.perf_counter() - start)
+    chars = sum(len(text) for text in paragraphs)
+    median = statistics.median(timings)
+    print(f"匹配 {chars} 字符：{median:.3f}s（{chars / median / 1e6:.1f} M字符/秒），命中 {hits} 次")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""应用冷启动与重跑开销基准测试
+
+在全新解释器中以 Streamlit 裸模式（不启动服务器）执行 app.py：
+冷启动为第一次执行的耗时（含全部模块导入）；重跑为同一进程内再次执行整个脚本的耗时中位数，
+与页面交互触发的重跑相同，模块与进程级缓存保持不变。未上传文件时测量的是空闲页面的重跑。
+--root 可指向其他版本的代码目录（如 git worktree），用于对比改动前后。
+
+用法：python benchmarks/bench_startup.py [--root 代码目录] [--repeat 5] [--reruns 20]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN_SNIPPET = """
+import os, sys, json, time, logging, warnings
+root, reruns = sys.argv[1], int(sys.argv[2])
+sys.path.insert(0, root)
+os.chdir(root)
+# 裸模式下 Streamlit 会对每个元素输出警告，测量时关闭
+logging.disable(logging.CRITICAL)
+warnings.simplefilter('ignore')
+path = os.path.join(root, 'app.py')
+with open(path, encoding='utf-8') as f:
+    code = compile(f.read(), path, 'exec')
+timings = []
+for _ in range(reruns + 1):
+    start = time.perf_counter()
+    exec(code, {'__name__': '__main__', '__file__': path})
+    timings.append(time.perf_counter() - start)
+print(json.dumps(timings))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量 app.py 冷启动与重跑耗时')
+    parser.add_argument('--root', default=ROOT, help='包含 app.py 的代码目录')
+    parser.add_argument('--repeat', type=int, default=5, help='冷启动测量次数（每次新建解释器），取中位数')
+    parser.add_argument('--reruns', type=int, default=20, help='每个解释器内的重跑次数')
+    args = parser.parse_args()
+    root = os.path.abspath(args.root)
+
+    colds, reruns = [], []
+    for _ in range(args.repeat):
+        result = subprocess.run([sys.executable, '-c', RUN_SNIPPET, root, str(args.reruns)],
+                                cwd=root, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr)
+            return
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        colds.append(timings[0])
+        reruns.append(statistics.median(timings[1:]))
+
+    print(f"代码目录：{root}")
+    print(f"冷启动（首次执行 app.py）：{statistics.median(colds) * 1000:.1f} ms")
+    print(f"重跑（再次执行 app.py）：{statistics.median(reruns) * 1000:.2f} ms")
+
+    # 列出冷启动时导入耗时最高的模块
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', RUN_SNIPPET, root, '0'],
+                            cwd=root, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    print("累计导入耗时最高的模块（us）：")
+    for cumulative, name in sorted(rows, reverse=True)[:10]:
+        print(f"  {cumulative:>10}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""本地模拟翻译接口：兼容 OpenAI chat/completions 协议，延迟随并发请求数增长
+
+并发数不超过 --knee 时延迟约为 --base-latency；超过后每多一个请求增加 --per-request 秒；
+超过 --max-inflight 时返回 429。另有 --tail-ratio 比例的请求额外变慢 --tail-latency 秒，用于观察对冲请求。
+
+用法：python benchmarks/mock_api_server.py [--port 8765] [--knee 8] [--max-inflight 24]
+然后设置 TRANSLATION_BACKENDS='[{"type": "openai", "api_url": "http://127.0.0.1:8765/v1/chat/completions", "api_key": "x"}]'
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockState:
+    def __init__(self, base_latency: float, per_request: float, knee: int, max_inflight: int,
+                 tail_ratio: float, tail_latency: float):
+        self.base_latency = base_latency
+        self.per_request = per_request
+        self.knee = knee
+        self.max_inflight = max_inflight
+        self.tail_ratio = tail_ratio
+        self.tail_latency = tail_latency
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.requests = 0
+        self.rejected = 0
+
+    def latency(self, inflight: int) -> float:
+        latency = self.base_latency + self.per_request * max(0, inflight - self.knee)
+        latency *= random.uniform(0.8, 1.2)
+        if random.random() < self.tail_ratio:
+            latency += self.tail_latency
+        return latency
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with state.lock:
+                self._send(200, {'inflight': state.inflight, 'peak_inflight': state.peak_inflight,
+                                 'requests': state.requests, 'rejected': state.rejected})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+            with state.lock:
+                state.requests += 1
+                if state.inflight >= state.max_inflight:
+                    state.rejected += 1
+                    rejected = True
+                else:
+                    rejected = False
+                    state.inflight += 1
+                    state.peak_inflight = max(state.peak_inflight, state.inflight)
+                    inflight = state.inflight
+            if rejected:
+                self._send(429, {'error': {'message': 'rate limited'}})
+                return
+            try:
+                time.sleep(state.latency(inflight))
+            finally:
+                with state.lock:
+                    state.inflight -= 1
+            messages = request.get('messages') or [{'content': ''}]
+            self._send(200, {'choices': [{'message': {'role': 'assistant', 'content': messages[-1]['content']}}]})
+
+    return Handler
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0, **options):
+    """在后台线程启动模拟服务，返回 (server, state)；port 为 0 时自动分配端口"""
+    state = MockState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--base-latency', type=float, default=0.2, help='低负载时的单次延迟（秒）')
+    parser.add_argument('--per-request', type=float, default=0.05, help='超过拐点后每个并发请求增加的延迟（秒）')
+    parser.add_argument('--knee', type=int, default=8, help='延迟开始上升的并发数')
+    parser.add_argument('--max-inflight', type=int, default=24, help='超过该并发数返回 429')
+    parser.add_argument('--tail-ratio', type=float, default=0.02, help='额外变慢的请求比例')
+    parser.add_argument('--tail-latency', type=float, default=2.0, help='慢请求额外延迟（秒）')
+
+
+def server_options(args) -> dict:
+    return {'base_latency': args.base_latency, 'per_request': args.per_request, 'knee': args.knee,
+            'max_inflight': args.max_inflight, 'tail_ratio': args.tail_ratio, 'tail_latency': args.tail_latency}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动延迟随负载变化的模拟翻译接口')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, _ = start_server(args.host, args.port, **server_options(args))
+    print(f"模拟接口：http://{args.host}:{server.server_address[1]}/v1/chat/completions（GET 查看统计）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import shutil
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@lru_cache(maxsize=None)
+def load_env() -> bool:
+    """加载.env文件，进程内只加载一次"""
+    load_dotenv()
+    return True
+
+
+@lru_cache(maxsize=None)
+def find_pdf2zh() -> Optional[str]:
+    """查找保版式引擎 pdf2zh：依次检查 tools 目录、虚拟环境 Scripts 目录和 PATH，结果在进程内缓存"""
+    local_path = os.path.join(APP_DIR, 'tools', 'pdf2zh', 'pdf2zh.exe')
+    if os.path.exists(local_path):
+        return local_path
+    venv_path = os.path.join(sys.prefix, 'Scripts', 'pdf2zh.exe')
+    if os.path.exists(venv_path):
+        return venv_path
+    return shutil.which('pdf2zh')
+
+
+@lru_cache(maxsize=None)
+def detect_docx_converters() -> dict:
+    """检测可用的DOCX转PDF方式（docx2pdf、Word COM、LibreOffice），结果在进程内缓存"""
+    try:
+        import docx2pdf  # noqa: F401
+        has_docx2pdf = True
+    except Exception:
+        has_docx2pdf = False
+    return {
+        'docx2pdf': has_docx2pdf,
+        'word_com': os.name == 'nt',
+        'soffice': shutil.which('soffice') or shutil.which('libreoffice')
+    }
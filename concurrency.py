@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional, TypeVar
+
+from scheduler import TranslationScheduler, get_scheduler
+
+OK = 'ok'
+RATE_LIMITED = 'rate_limited'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+T = TypeVar('T')
+
+
+def classify_error(error: Exception) -> str:
+    """把后端异常归类为限流、超时或其他错误"""
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) == 429:
+        return RATE_LIMITED
+    if 'Timeout' in type(error).__name__:
+        return TIMEOUT
+    return ERROR
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class AdaptiveConcurrencyController:
+    """AIMD 并发控制：健康且并发已用满时逐步增加并发，限流、超时或 p95 明显升高时成倍回退
+
+    控制结果写入调度器的并发预算；同时根据延迟分布给出对冲请求的等待阈值。
+    """
+
+    def __init__(self, scheduler: TranslationScheduler, initial: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 increase: float = 1.0, decrease: float = 0.5, window: int = 40, p95_tolerance: float = 2.0,
+                 hedge_multiplier: float = 2.0, hedge_budget: float = 0.05):
+        self.scheduler = scheduler
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.window = window
+        self.p95_tolerance = p95_tolerance
+        self.hedge_multiplier = hedge_multiplier
+        self.hedge_budget = hedge_budget
+        self._lock = threading.Lock()
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._latencies = deque(maxlen=200)  # 最近成功请求的延迟，用于对冲阈值
+        self._window_latencies = []
+        self._window_errors = 0
+        self._baseline_p95 = None  # 健康状态下的 p95 基线
+        self._last_decrease = 0.0
+        self._counts = {OK: 0, RATE_LIMITED: 0, TIMEOUT: 0, ERROR: 0}
+        self._requests = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._apply()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _apply(self):
+        self.scheduler.set_capacity(int(self._limit))
+
+    def _decrease(self, now: float):
+        self._limit = max(self.min_limit, self._limit * self.decrease)
+        self._last_decrease = now
+        self._window_latencies = []
+        self._window_errors = 0
+        self.scheduler.take_peak_in_flight()
+        self._apply()
+
+    def record(self, latency: float, error: Optional[Exception] = None):
+        """记录一次后端请求的延迟和结果（error 为 None 表示成功），作为 BackendRouter 的 listener"""
+        outcome = OK if error is None else classify_error(error)
+        now = time.monotonic()
+        with self._lock:
+            self._requests += 1
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+            if outcome == OK:
+                self._latencies.append(latency)
+            # 回退之前发出的请求反映的是旧并发下的状态，不再触发调整，避免一次拥塞连续回退
+            if now - latency < self._last_decrease:
+                return
+            if outcome in (RATE_LIMITED, TIMEOUT):
+                self._decrease(now)
+                return
+            if outcome == OK:
+                self._window_latencies.append(latency)
+            else:
+                self._window_errors += 1
+
+            if len(self._window_latencies) + self._window_errors < self.window:
+                return
+            p95 = _percentile(self._window_latencies, 0.95) if self._window_latencies else None
+            error_rate = self._window_errors / (len(self._window_latencies) + self._window_errors)
+            self._window_latencies = []
+            self._window_errors = 0
+            peak_in_flight = self.scheduler.take_peak_in_flight()
+
+            if p95 is not None and self._baseline_p95 is not None and p95 > self._baseline_p95 * self.p95_tolerance:
+                self._decrease(now)
+                return
+            if p95 is not None:
+                # 基线取健康窗口的较低值，并缓慢跟随服务端的常态变化
+                if self._baseline_p95 is None or p95 < self._baseline_p95:
+                    self._baseline_p95 = p95
+                else:
+                    self._baseline_p95 += 0.05 * (p95 - self._baseline_p95)
+            # 只有本窗口的在途请求数达到当前上限时才加并发：需求不足时健康只说明上限没被用满
+            if error_rate < 0.05 and peak_in_flight >= int(self._limit) and self._limit < self.max_limit:
+                self._limit = min(self.max_limit, self._limit + self.increase)
+                self._apply()
+
+    def hedge_delay(self) -> Optional[float]:
+        """请求超过该时长仍未返回时发出对冲请求；样本不足或对冲预算用完时返回 None"""
+        with self._lock:
+            if len(self._latencies) < self.window:
+                return None
+            if self._hedges >= max(1, self._requests * self.hedge_budget):
+                return None
+            return _percentile(self._latencies, 0.95) * self.hedge_multiplier
+
+    def record_hedge(self, won: bool):
+        with self._lock:
+            self._hedges += 1
+            if won:
+                self._hedge_wins += 1
+
+    def snapshot(self) -> dict:
+        """当前并发上限、延迟分位数、各类结果计数和对冲统计"""
+        with self._lock:
+            latencies = list(self._latencies)
+            return {
+                'limit': int(self._limit),
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'p50': _percentile(latencies, 0.5) if latencies else None,
+                'p95': _percentile(latencies, 0.95) if latencies else None,
+                'baseline_p95': self._baseline_p95,
+                'requests': self._requests,
+                'outcomes': dict(self._counts),
+                'hedges': self._hedges,
+                'hedge_wins': self._hedge_wins,
+            }
+
+
+def hedged_call(fn: Callable[[], T], controller: AdaptiveConcurrencyController,
+                executor: ThreadPoolExecutor) -> T:
+    """执行请求；若超过对冲阈值仍未返回，再发一个相同请求，取先完成的结果"""
+    delay = controller.hedge_delay()
+    if delay is None:
+        return fn()
+    primary = executor.submit(fn)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    hedge = executor.submit(fn)
+    pending = {primary, hedge}
+    last_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            controller.record_hedge(future is hedge)
+            return result
+    controller.record_hedge(False)
+    raise last_error
+
+
+_controller: Optional[AdaptiveConcurrencyController] = None
+_controller_lock = threading.Lock()
+
+
+def get_controller() -> AdaptiveConcurrencyController:
+    """获取进程级并发控制器，上限为 TRANSLATION_MAX_CONCURRENCY，初始值为 TRANSLATION_INITIAL_CONCURRENCY"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            max_limit = int(os.getenv('TRANSLATION_MAX_CONCURRENCY', '8'))
+            initial = int(os.getenv('TRANSLATION_INITIAL_CONCURRENCY', str(min(4, max_limit))))
+            _controller = AdaptiveConcurrencyController(get_scheduler(), initial=initial, max_limit=max_limit)
+        return _controller
@@ -0,0 +1,125 @@
+import io
+import csv
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import ahocorasick
+
+
+# ASCII 字母数字和下划线：以它们开头或结尾的术语需要在词边界上匹配
+_WORD_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_')
+# 自动机输出 (结尾位置, 键序号)，换成 (键序号, 结尾位置) 以构建字典
+_KEY_END = itemgetter(1, 0)
+
+
+def _encode(text: str) -> str:
+    """把文本换成其UTF-8字节串（每个字节一个字符）
+
+    pyahocorasick 逐个线性查找子节点，中文等大字符集会使根节点有数千个子节点；
+    按字节匹配时每个节点最多256个子节点。ASCII 字符不变，词边界判断不受影响，位置顺序与原文一致。
+    """
+    return text.encode('utf-8', 'surrogatepass').decode('latin-1')
+
+
+class Glossary:
+    """术语表：用 Aho-Corasick 自动机在文本中查找出现的术语
+
+    每次翻译请求只附带命中的术语对，避免把整张术语表塞进提示词。
+    自动机（pyahocorasick，C实现）对每段文本只扫描一遍，耗时与文本长度成线性，与术语条数基本无关；
+    3万条术语、200万字符实测约0.75秒，其中自动机扫描约0.36秒（见 benchmarks/bench_glossary.py）。
+    以字母数字开头或结尾的术语要求在词边界上匹配（"cat" 不匹配 "category"）。
+    默认忽略大小写。languages 为语言名称到代码的映射（如 {"英语": "en"}），术语的目标语言列和
+    match 的 lang 可以是代码或名称，均先换算为代码再比较。
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]], case_sensitive: bool = False,
+                 languages: Optional[Dict[str, str]] = None):
+        self.case_sensitive = case_sensitive
+        self._language_codes: Dict[str, str] = {}
+        for name, code in (languages or {}).items():
+            self._language_codes[name.strip().lower()] = code
+            self._language_codes[code.strip().lower()] = code
+        # 每个术语：(原文, 译文, 目标语言代码)，目标语言为空表示适用于所有语言
+        self.terms: List[Tuple[str, str, str]] = []
+        # 自动机的值为键序号，折叠后相同的原文共用一个键；按键序号保存：
+        # 编码后的键、(字节长度-1, 是否检查开头词边界, 是否检查结尾词边界)、[((原文, 译文), 目标语言代码), ...]
+        self._automaton = ahocorasick.Automaton()
+        self._keys: List[str] = []
+        self._key_info: List[Tuple[int, bool, bool]] = []
+        self._key_terms: List[List[Tuple[Tuple[str, str], str]]] = []
+        for source, target, lang in entries:
+            source = source.strip()
+            target = target.strip()
+            if source and target:
+                self._add(source, target, self._language_code(lang))
+        if self.terms:
+            self._automaton.make_automaton()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _language_code(self, lang: Optional[str]) -> str:
+        lang = (lang or '').strip()
+        return self._language_codes.get(lang.lower(), lang)
+
+    def _fold(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def _add(self, source: str, target: str, lang: str):
+        self.terms.append((source, target, lang))
+        key = _encode(self._fold(source))
+        key_id = self._automaton.get(key, None)
+        if key_id is None:
+            key_id = len(self._keys)
+            self._keys.append(key)
+            self._key_info.append((len(key) - 1, key[0] in _WORD_CHARS, key[-1] in _WORD_CHARS))
+            self._key_terms.append([])
+            self._automaton.add_word(key, key_id)
+        self._key_terms[key_id].append(((source, target), lang))
+
+    def match(self, text: str, lang: Optional[str] = None) -> List[Tuple[str, str]]:
+        """返回文本中出现的 (原文术语, 译文) 列表，按首次出现位置排序、去重；lang 可以是语言代码或名称"""
+        if not self.terms or not text:
+            return []
+        lang = self._language_code(lang)
+        encoded = _encode(self._fold(text))
+        # 首尾各补一个空格，边界检查无需判断是否越界
+        padded = f" {encoded} "
+        # 每个键只保留第一次出现的结尾位置：倒序构建字典，先出现的覆盖后出现的
+        first_ends = dict(map(_KEY_END, reversed(list(self._automaton.iter(encoded)))))
+        hits = []
+        for key_id, end in first_ends.items():
+            span, check_start, check_end = self._key_info[key_id]
+            start = end - span
+            if (check_start and padded[start] in _WORD_CHARS) or (check_end and padded[end + 2] in _WORD_CHARS):
+                # 第一次出现不在词边界上（如 "cat" 出现在 "category" 中），继续查找后面的出现
+                key = self._keys[key_id]
+                start = encoded.find(key, start + 1)
+                while start != -1 and ((check_start and padded[start] in _WORD_CHARS)
+                                       or (check_end and padded[start + span + 2] in _WORD_CHARS)):
+                    start = encoded.find(key, start + 1)
+                if start == -1:
+                    continue
+            hits.append((start, key_id))
+        hits.sort()
+        return [pair for _, key_id in hits for pair, term_lang in self._key_terms[key_id]
+                if not lang or not term_lang or term_lang == lang]
+
+    @classmethod
+    def from_bytes(cls, data: bytes, filename: str = '', case_sensitive: bool = False,
+                   languages: Optional[Dict[str, str]] = None) -> 'Glossary':
+        """解析CSV/TSV术语表：每行 原文,译文[,目标语言]，支持UTF-8（含BOM）"""
+        text = data.decode('utf-8-sig')
+        delimiter = '\t' if filename.lower().endswith(('.tsv', '.txt')) or '\t' in text.split('\n', 1)[0] else ','
+        entries = []
+        for row in csv.reader(io.StringIO(text), delimiter=delimiter):
+            if len(row) < 2 or row[0].strip().startswith('#'):
+                continue
+            entries.append((row[0], row[1], row[2] if len(row) > 2 else ''))
+        return cls(entries, case_sensitive=case_sensitive, languages=languages)
+
+    @classmethod
+    def from_file(cls, path: str, case_sensitive: bool = False,
+                  languages: Optional[Dict[str, str]] = None) -> 'Glossary':
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read(), path, case_sensitive, languages)
@@ -0,0 +1,119 @@
+import os
+import hashlib
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_OCR_LANGUAGES = 'chi_sim+eng'
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'ocr')
+
+
+def ocr_available() -> bool:
+    """检查本地是否可用 Tesseract（pytesseract 及 tesseract 可执行文件）"""
+    try:
+        import pytesseract
+    except ImportError:
+        return False
+    cmd = getattr(pytesseract.pytesseract, 'tesseract_cmd', 'tesseract')
+    return bool(shutil.which(cmd) or os.path.exists(cmd))
+
+
+def _ocr_page(pdf_path: str, page_num: int, languages: str, cache_dir: str, dpi: int) -> Tuple[int, str]:
+    """在工作进程中渲染单页并识别文字，结果按页面图像哈希缓存"""
+    import pypdfium2 as pdfium
+    import pytesseract
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        image = pdf[page_num - 1].render(scale=dpi / 72).to_pil()
+    finally:
+        pdf.close()
+
+    digest = hashlib.sha256(image.tobytes()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{digest}-{languages}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return page_num, f.read()
+
+    text = pytesseract.image_to_string(image, lang=languages)
+
+    # 先写临时文件再原子替换，避免并发写入产生残缺缓存
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    return page_num, text
+
+
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_workers = 0
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """获取进程级OCR进程池，大小为 OCR_MAX_WORKERS（默认CPU核数）；多个任务同时识别时共享，总进程数不超过上限"""
+    global _ocr_pool, _ocr_pool_workers
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool_workers = int(os.getenv('OCR_MAX_WORKERS', '0')) or os.cpu_count() or 1
+            _ocr_pool = ProcessPoolExecutor(max_workers=_ocr_pool_workers)
+        return _ocr_pool
+
+
+def _discard_ocr_pool(pool: ProcessPoolExecutor):
+    """工作进程异常退出后进程池不可再用，丢弃后下次调用重新创建"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is pool:
+            _ocr_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def ocr_pages(pdf_path: str, page_numbers: List[int], languages: Optional[str] = None,
+              max_workers: Optional[int] = None, cache_dir: Optional[str] = None, dpi: int = 300,
+              progress_callback=None) -> Dict[int, str]:
+    """对指定页（从1开始）并行OCR，返回 {页码: 文本}
+
+    识别语言由 OCR_LANGUAGES 配置（默认 chi_sim+eng）；各页在进程级共享进程池（get_ocr_pool，
+    大小由 OCR_MAX_WORKERS 配置）中识别，max_workers 限制本次调用同时占用的工作进程数。
+    """
+    if not page_numbers:
+        return {}
+    languages = languages or os.getenv('OCR_LANGUAGES', DEFAULT_OCR_LANGUAGES)
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    pool = get_ocr_pool()
+    # 每次调用同时提交的页数不超过 max_workers（默认为进程池大小），并发任务轮流使用共享进程池
+    max_workers = min(max_workers or _ocr_pool_workers, len(page_numbers))
+
+    results = {}
+    pending = set()
+
+    def collect():
+        nonlocal pending
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            page_num, text = future.result()
+            results[page_num] = text
+            if progress_callback:
+                progress_callback(len(results), len(page_numbers))
+
+    try:
+        for page_num in page_numbers:
+            if len(pending) >= max_workers:
+                collect()
+            pending.add(pool.submit(_ocr_page, pdf_path, page_num, languages, cache_dir, dpi))
+        while pending:
+            collect()
+    except BrokenProcessPool:
+        _discard_ocr_pool(pool)
+        raise
+    finally:
+        # 出错或被中断时取消本次尚未开始的页面，不影响其他任务
+        for future in pending:
+            future.cancel()
+    return results
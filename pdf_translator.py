@@ -1,85 +1,147 @@
 import os
-from typing import List, Tuple
+from typing import List
 from dotenv import load_dotenv
-import requests
-import pdfplumber
-from PyPDF2 import PdfMerger, PdfReader, PdfWriter
 import streamlit as st
 import tempfile
-import docx
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
 import urllib.request
 import zipfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+import time
+import random
+from translation_memory import TranslationMemory
+from translation_backends import BackendRouter, load_backends
+from scheduler import JobCancelled, get_scheduler
+from concurrency import ERROR, classify_error, get_controller, hedged_call
+from ocr import ocr_available, ocr_pages
+from extraction_backends import get_extraction_backend
+from segments import PageContent, Segment, image_bbox
+from rendering import render_pages
+from glossary import Glossary
+from profiling import JobProfiler, propagate
+
+# pdfplumber、PyPDF2、python-docx、requests、reportlab 均在使用时才导入，缩短应用冷启动时间
+
+# 已注册的字体名，进程内只注册一次
+_registered_font = None
+_font_lock = threading.Lock()
+
+# 限流或超时后的重试次数，每次重试前按指数退避等待
+RATE_LIMIT_RETRIES = 3
+
 
 class PDFTranslator:
+    # 输出格式或翻译流程变化时递增，使旧的结果缓存失效
+    ENGINE_VERSION = '2'
+
     def __init__(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
         load_dotenv()
-        self.api_key = os.getenv('DEEPSEEK_API_KEY')
-        self.api_url = 'https://api.siliconflow.cn/v1/chat/completions'
-        self.headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        # 共享连接池，多语言并发翻译时复用同一组连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # 进程级调度器：所有会话共享API并发预算，预算由AIMD控制器按限流和延迟动态调整
+        self.scheduler = get_scheduler()
+        self.controller = get_controller()
+        # 翻译后端池：按权重与延迟分发请求，故障后端暂时摘除；每次请求结果反馈给并发控制器
+        self.router = BackendRouter(load_backends(self.session), listener=self.controller.record)
+        # 执行对冲请求的线程池，主请求与对冲请求都在其中运行
+        self._hedge_pool = ThreadPoolExecutor(max_workers=self.controller.max_limit * 2,
+                                              thread_name_prefix='hedge')
         # 确保字体目录存在
         self.fonts_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
         if not os.path.exists(self.fonts_dir):
             os.makedirs(self.fonts_dir)
-
-    def extract_text_from_pdf(self, pdf_path: str) -> List[Tuple[int, dict]]:
-        """从PDF文件中提取文本、表格和图片，按段落返回内容"""
+        # 翻译记忆库：复用历史版本中相同或近似段落的译文
+        tm_path = os.getenv('TRANSLATION_MEMORY_PATH') or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'cache', 'translation_memory.jsonl')
+        self.translation_memory = TranslationMemory(tm_path)
+        # PDF文本提取后端（pdfium或pdfplumber）
+        self.extraction_backend = get_extraction_backend()
+
+    @staticmethod
+    def _split_paragraphs(text: str) -> List[Segment]:
+        """按两个或更多换行符分割段落"""
+        paragraphs = []
+        for para in text.split('\n\n'):
+            para = para.strip()
+            if para:
+                paragraphs.append(Segment(para))
+        return paragraphs
+
+    def extract_text_from_pdf(self, pdf_path: str) -> List[PageContent]:
+        """从PDF文件中提取文本、表格和图片，按段落返回内容；无文本层的页面使用OCR识别"""
         content_by_page = []
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                # 创建文本提取进度条
-                extract_progress = st.progress(0)
-                extract_status = st.empty()
-                
-                for page_num, page in enumerate(pdf.pages, start=1):
-                    extract_status.text(f"正在提取第 {page_num}/{total_pages} 页...")
-                    extract_progress.progress(page_num / total_pages)
-                    
-                    # 获取页面文本
-                    text = page.extract_text() or ""
-                    
-                    # 使用更精确的段落分割方法
-                    paragraphs = []
-                    # 按两个或更多换行符分割段落
-                    raw_paragraphs = text.split('\n\n')
-                    
-                    for para in raw_paragraphs:
-                        para = para.strip()
-                        if para:
-                            paragraphs.append({
-                                'text': para,
-                                'bbox': None
-                            })
-
-                    page_content = {
-                        "paragraphs": paragraphs,
-                        "tables": page.extract_tables(),
-                        "images": page.images
-                    }
-                    content_by_page.append((page_num, page_content))
-                
-                extract_status.text("文本提取完成！")
-                extract_progress.progress(1.0)
-                return content_by_page
+            scanned_pages = []
+            # 创建文本提取进度条
+            extract_progress = st.progress(0)
+            extract_status = st.empty()
+
+            def on_extract(page_num, total_pages):
+                extract_status.text(f"正在提取第 {page_num}/{total_pages} 页...")
+                extract_progress.progress(page_num / total_pages)
+
+            for page_num, text, tables, images in self.extraction_backend.extract(pdf_path, on_extract):
+                if not text.strip():
+                    # 没有文本层，留待OCR
+                    scanned_pages.append(page_num)
+
+                content_by_page.append(PageContent(
+                    page_num,
+                    self._split_paragraphs(text),
+                    tables,
+                    [image_bbox(image) for image in images]
+                ))
+
+            # 仅对扫描页并行OCR，结果并入相同的段落结构
+            if scanned_pages:
+                if ocr_available():
+                    def on_progress(done, total):
+                        extract_status.text(f"正在识别扫描页 {done}/{total}...")
+                        extract_progress.progress(done / total)
+
+                    ocr_results = ocr_pages(pdf_path, scanned_pages, progress_callback=on_progress)
+                    for page_content in content_by_page:
+                        if page_content.page_num in ocr_results:
+                            page_content.paragraphs = self._split_paragraphs(ocr_results[page_content.page_num])
+                else:
+                    st.warning(f"检测到 {len(scanned_pages)} 个无文本层的扫描页，但未安装Tesseract，这些页面将不会被翻译")
+
+            extract_status.text("文本提取完成！")
+            extract_progress.progress(1.0)
+            return content_by_page
                 
         except Exception as e:
             raise Exception(f'PDF文件读取失败：{str(e)}')
 
-    def translate_text(self, text: str, target_lang: str) -> str:
-        """调用Deepseek API翻译文本"""
+    def translate_text(self, text: str, target_lang: str, job_id: str = None, glossary: Glossary = None) -> str:
+        """调用翻译后端翻译文本，优先复用翻译记忆库中的译文；指定job_id时经调度器排队
+
+        指定glossary时，仅把该段文本中出现的术语及其译法加入提示词；记忆库中完全相同原文的译文
+        未使用术语的指定译法时，作为参考译文重新请求。
+        """
         if not isinstance(text, str):
             raise ValueError("输入的文本必须是字符串类型")
         if not text.strip():
             return ""  # 如果文本为空，直接返回空字符串
 
+        # 规范化后完全相同且已使用术语表译法时才直接复用，其余情况改为“修改参考译文”的请求
+        terms = glossary.match(text, target_lang) if glossary else []
+        reused = self.translation_memory.exact(text, target_lang)
+        if reused is not None:
+            folded = reused.lower()
+            if all(target.lower() in folded for _, target in terms):
+                return reused
+            match = (1.0, text, reused)
+        else:
+            match = self.translation_memory.lookup(text, target_lang)
+
         system_prompt = f"""你是一个专业的翻译助手。请严格按照以下要求翻译文本：
 1. 只输出翻译后的内容，不要添加任何解释、注释或说明
 2. 保持原文的格式和段落结构
@@ -87,118 +149,82 @@ class PDFTranslator:
 4. 不要输出"翻译如下"、"以下是翻译"、“原文”、“译文”等提示性文字
 5. 不要添加任何括号内的解释或补充说明
 6. 直接输出翻译结果，不要有任何前缀或后缀"""
+        rule_num = 7
+        user_content = text
+        if match:
+            _, reference_source, reference_target = match
+            system_prompt += f"""
+{rule_num}. 用户会提供旧原文、参考译文和新原文，请只根据新旧原文的差异及术语要求修改参考译文，其余部分保持不变，输出新原文的完整译文"""
+            rule_num += 1
+            user_content = f"旧原文：\n{reference_source}\n\n参考译文：\n{reference_target}\n\n新原文：\n{text}"
+        if terms:
+            term_lines = '\n'.join(f"{source} → {target}" for source, target in terms)
+            system_prompt += f"""
+{rule_num}. 以下术语必须使用指定译法：
+{term_lines}"""
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_content, 'source': text}
+        ]
         try:
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json={
-                    'model': 'deepseek-ai/DeepSeek-V3',
-                    'messages': [
-                        {'role': 'system', 'content': system_prompt},
-                        {'role': 'user', 'content': text}
-                    ],
-                    'max_tokens': 1000,  # 限制最大 token 数，避免超出限制
-                    'temperature': 0.3
-                }
-            )
-            response.raise_for_status()
-            result = response.json()
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                raise Exception("翻译API返回的结果格式不正确")
+            backend, translated = self._complete(messages, job_id)
+        except JobCancelled:
+            raise
         except Exception as e:
             raise Exception(f'翻译请求失败：{str(e)}')
+        if backend.cacheable:
+            self.translation_memory.add(text, translated, target_lang)
+        return translated
+
+    def _complete(self, messages: List[dict], job_id: str = None):
+        """发送请求，返回 (完成请求的后端, 译文)：尾部延迟时发出对冲请求，限流或超时后释放并发槽位、退避重试"""
+        def call():
+            # 限制最大 token 数，避免超出限制
+            return self.router.route(messages, max_tokens=1000, temperature=0.3)
 
-    def create_translated_pdf(self, original_pdf: str, original_texts: List[Tuple[int, dict]], 
-                        translated_texts: List[Tuple[int, dict]], output_path: str, show_comparison: bool = True):
-        """创建翻译后的PDF文件，支持原文译文对照"""
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                if job_id:
+                    with self.scheduler.slot(job_id):
+                        return hedged_call(call, self.controller, self._hedge_pool)
+                return hedged_call(call, self.controller, self._hedge_pool)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                if attempt == RATE_LIMIT_RETRIES or classify_error(e) == ERROR:
+                    raise
+            time.sleep(min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def create_translated_pdf(self, original_pdf: str, original_texts: List[PageContent], 
+                        translated_texts: List[PageContent], output_path: str, show_comparison: bool = True,
+                        progress_callback=None):
+        """创建翻译后的PDF文件，支持原文译文对照；按页分块并行排版"""
         try:
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-            from reportlab.lib.units import inch
-            from reportlab.lib import colors
-            
-            # 创建PDF文档
-            doc = SimpleDocTemplate(
-                output_path,
-                pagesize=letter,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=72
-            )
-            
             # 注册多语言字体
-            font_name = self._register_fonts()
-            
-            # 创建样式
-            styles = getSampleStyleSheet()
-            original_style = ParagraphStyle(
-                'OriginalText',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=11,
-                leading=16,
-                spaceAfter=6,
-                alignment=0,  # 左对齐
-                textColor='#666666'
-            )
-            translated_style = ParagraphStyle(
-                'TranslatedText',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=12,
-                leading=18,
-                spaceAfter=12,
-                alignment=0  # 左对齐
-            )
-            
-            # 构建文档内容
-            story = []
-            
-            for (orig_page, orig_content), (trans_page, trans_content) in zip(original_texts, translated_texts):
-                # 处理段落
-                for orig_para, trans_para in zip(orig_content["paragraphs"], trans_content["paragraphs"]):
-                    if show_comparison:
-                        # 添加原文
-                        if orig_para["text"].strip():
-                            story.append(Paragraph(orig_para["text"].strip(), original_style))
-                        # 添加译文
-                        if trans_para["text"].strip():
-                            story.append(Paragraph(trans_para["text"].strip(), translated_style))
-                    else:
-                        # 仅显示译文
-                        if trans_para["text"].strip():
-                            story.append(Paragraph(trans_para["text"].strip(), translated_style))
-                
-                story.append(Spacer(1, 12))  # 段落间距
-
-                # 添加表格
-                for table in orig_content["tables"]:
-                    table_data = [[Paragraph(cell or "", original_style) for cell in row] for row in table]
-                    table_obj = Table(table_data)
-                    table_obj.setStyle(TableStyle([
-                        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                        ('FONTNAME', (0, 0), (-1, -1), font_name),
-                        ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ]))
-                    story.append(table_obj)
-                    story.append(Spacer(1, 12))
-                
-                # 添加图片
-                for image in orig_content["images"]:
-                    img = Image(image["src"], width=inch, height=inch)
-                    story.append(img)
-                    story.append(Spacer(1, 12))
-        
-            # 生成PDF
-            doc.build(story)
-    
+            font_name, font_path = self._font_spec()
+            render_pages('comparison', [original_texts, translated_texts], output_path, font_name, font_path,
+                         show_comparison=show_comparison, progress_callback=progress_callback)
+
         except Exception as e:
             raise Exception(f'PDF文件创建失败：{str(e)}')
     
     def _register_fonts(self):
+        """注册多语言字体，进程内只注册一次，返回字体名"""
+        return self._font_spec()[0]
+
+    def _font_spec(self):
+        """返回已注册字体的 (字体名, 字体文件路径)，供排版工作进程重新注册"""
+        global _registered_font
+        with _font_lock:
+            if _registered_font is not None:
+                return _registered_font
+            font_spec = self._find_and_register_font()
+            # 回退字体不缓存，下次仍尝试注册中文字体
+            if font_spec[1]:
+                _registered_font = font_spec
+            return font_spec
+
+    def _find_and_register_font(self):
         """注册多语言字体，如果本地没有则自动下载"""
         # 字体文件路径
         font_paths = {
@@ -216,7 +242,7 @@ class PDFTranslator:
                     from reportlab.pdfbase import pdfmetrics
                     from reportlab.pdfbase.ttfonts import TTFont
                     pdfmetrics.registerFont(TTFont(font_name, font_path))
-                    return font_name
+                    return font_name, font_path
             except Exception as e:
                 st.warning(f"注册字体 {font_name} 失败: {str(e)}")
                 continue
@@ -245,15 +271,17 @@ class PDFTranslator:
             from reportlab.pdfbase import pdfmetrics
             from reportlab.pdfbase.ttfonts import TTFont
             pdfmetrics.registerFont(TTFont('SourceHanSans', source_han_path))
-            return 'SourceHanSans'
+            return 'SourceHanSans', source_han_path
         except Exception as e:
             st.error(f"下载安装思源黑体失败: {str(e)}")
             # 最后的备选方案
-            return 'Helvetica'
+            return 'Helvetica', None
 
     # 添加Word文档处理方法
-    def extract_text_from_docx(self, docx_path: str) -> List[Tuple[int, dict]]:
+    def extract_text_from_docx(self, docx_path: str) -> List[PageContent]:
         """从Word文档中提取文本，按段落返回内容"""
+        from docx import Document
+
         content_by_page = []
         try:
             doc = Document(docx_path)
@@ -270,10 +298,7 @@ class PDFTranslator:
             # 提取段落
             for para in doc.paragraphs:
                 if para.text.strip():
-                    paragraphs.append({
-                        'text': para.text.strip(),
-                        'bbox': None
-                    })
+                    paragraphs.append(Segment(para.text.strip()))
             
             # 提取表格
             for table in doc.tables:
@@ -285,12 +310,8 @@ class PDFTranslator:
                     tables.append(table_data)
             
             # 由于Word文档没有明确的页面概念，我们将整个文档视为一页
-            page_content = {
-                "paragraphs": paragraphs,
-                "tables": tables,
-                "images": []  # Word文档中的图片处理较复杂，暂不支持
-            }
-            content_by_page.append((1, page_content))
+            # Word文档中的图片处理较复杂，暂不支持
+            content_by_page.append(PageContent(1, paragraphs, tables))
             
             extract_status.text("文本提取完成！")
             extract_progress.progress(1.0)
@@ -299,8 +320,16 @@ class PDFTranslator:
         except Exception as e:
             raise Exception(f'Word文档读取失败：{str(e)}')
 
-    def create_interleaved_docx(self, input_file: str, translated_texts: List[Tuple[int, dict]], output_path: str):
-        """创建交错的Word文档：按段落原文-译文交替显示，不包含任何提示性标题"""
+    def create_interleaved_docx(self, input_file: str, translated_texts: List[PageContent], output_path: str,
+                                original_texts: List[PageContent] = None):
+        """创建交错的Word文档：按段落原文-译文交替显示，不包含任何提示性标题
+
+        传入original_texts时直接使用已提取的原文，不再重新读取input_file。
+        """
+        from docx import Document
+        from docx.shared import Pt
+        from docx.oxml.ns import qn
+
         try:
             doc = Document()
 
@@ -313,22 +342,16 @@ class PDFTranslator:
                 rFonts = style.element.rPr.rFonts
                 rFonts.set(qn('w:eastAsia'), 'SimSun')
 
-            # 读取原始文档内容
-            original_doc = Document(input_file)
-
-            original_paragraphs = [p.text.strip() for p in original_doc.paragraphs if p.text.strip()]
-            original_tables = []
-            for table in original_doc.tables:
-                t = []
-                for row in table.rows:
-                    t.append([cell.text for cell in row.cells])
-                if t:
-                    original_tables.append(t)
+            # 原始文档内容
+            if original_texts is None:
+                original_texts = self.extract_text_from_docx(input_file)
+            original_paragraphs = [p.text for page in original_texts for p in page.paragraphs]
+            original_tables = [t for page in original_texts for t in page.tables]
 
             # 译文数据（docx视为单页）
-            translated_page = translated_texts[0][1] if translated_texts else {"paragraphs": [], "tables": []}
-            translated_paragraphs = [p.get("text", "").strip() for p in translated_page.get("paragraphs", [])]
-            translated_tables = translated_page.get("tables", [])
+            translated_page = translated_texts[0] if translated_texts else PageContent(1)
+            translated_paragraphs = [(p.text or "").strip() for p in translated_page.paragraphs]
+            translated_tables = translated_page.tables
 
             # 段落：原文与译文交替，无标题、无分隔线
             n = max(len(original_paragraphs), len(translated_paragraphs))
@@ -384,8 +407,12 @@ class PDFTranslator:
         except Exception as e:
             raise Exception(f'Word文档创建失败：{str(e)}')
 
-    def create_translated_docx(self, translated_texts: List[Tuple[int, dict]], output_path: str, show_comparison: bool = True):
+    def create_translated_docx(self, translated_texts: List[PageContent], output_path: str, show_comparison: bool = True):
         """创建仅译文的Word文档（无任何提示性标题），按段落排版"""
+        from docx import Document
+        from docx.shared import Pt
+        from docx.oxml.ns import qn
+
         try:
             doc = Document()
 
@@ -397,9 +424,9 @@ class PDFTranslator:
                 style.element.rPr.rFonts.set(qn('w:eastAsia'), 'SimSun')
 
             # 遍历所有译文页（docx通常只有一页结构）
-            for _, page_content in translated_texts:
-                for para in page_content.get("paragraphs", []):
-                    text = (para.get("text") or "").strip()
+            for page_content in translated_texts:
+                for para in page_content.paragraphs:
+                    text = (para.text or "").strip()
                     if text:
                         p = doc.add_paragraph(text)
                         p.paragraph_format.first_line_indent = Pt(24)
@@ -408,7 +435,7 @@ class PDFTranslator:
                             if run._element.rPr is not None and run._element.rPr.rFonts is not None:
                                 run._element.rPr.rFonts.set(qn('w:eastAsia'), 'SimSun')
 
-                for table_data in page_content.get("tables", []):
+                for table_data in page_content.tables:
                     if table_data:
                         table = doc.add_table(rows=len(table_data), cols=len(table_data[0]))
                         table.style = 'Table Grid'
@@ -426,74 +453,22 @@ class PDFTranslator:
         except Exception as e:
             raise Exception(f'Word文档创建失败：{str(e)}')
 
-    def _create_translation_pages(self, translated_texts: List[Tuple[int, dict]], output_path: str):
-        """创建译文页面（无提示性标题），每页按段落排版"""
+    def _create_translation_pages(self, translated_texts: List[PageContent], output_path: str,
+                                  progress_callback=None):
+        """创建译文页面（无提示性标题），每页按段落排版；按页分块在进程池中并行生成后拼接"""
         try:
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib.units import inch
-            from reportlab.lib import colors
-
-            doc = SimpleDocTemplate(
-                output_path,
-                pagesize=letter,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=72
-            )
-
-            font_name = self._register_fonts()
-            styles = getSampleStyleSheet()
-
-            translated_style = ParagraphStyle(
-                'TranslatedText',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=12,
-                leading=18,
-                spaceBefore=6,
-                spaceAfter=6,
-                alignment=0  # 左对齐
-            )
-
-            story = []
-
-            for i, (page_num, page_content) in enumerate(translated_texts):
-                if i > 0:
-                    story.append(PageBreak())
-
-                # 仅添加译文段落（不再添加“第 X 页译文”等标题）
-                paragraphs = page_content.get("paragraphs", [])
-                for para in paragraphs:
-                    text = (para.get("text") or "").strip()
-                    if text:
-                        story.append(Paragraph(text, translated_style))
-                        story.append(Spacer(1, 8))
-
-                # 表格（不添加“表格数据”、“表格 X”等提示）
-                for table_data in page_content.get("tables", []):
-                    if table_data:
-                        table = Table(table_data, repeatRows=0)
-                        table.setStyle(TableStyle([
-                            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                            ('FONTNAME', (0, 0), (-1, -1), font_name),
-                            ('FONTSIZE', (0, 0), (-1, -1), 10),
-                            ('PADDING', (0, 0), (-1, -1), 6),
-                            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                        ]))
-                        story.append(table)
-                        story.append(Spacer(1, 12))
-
-            doc.build(story)
+            font_name, font_path = self._font_spec()
+            render_pages('translation', [translated_texts], output_path, font_name, font_path,
+                         progress_callback=progress_callback)
 
         except Exception as e:
             raise Exception(f'译文页面创建失败：{str(e)}')
     
-    def create_interleaved_pdf(self, original_pdf: str, translated_texts: List[Tuple[int, dict]], output_path: str):
+    def create_interleaved_pdf(self, original_pdf: str, translated_texts: List[PageContent], output_path: str,
+                               progress_callback=None):
         """创建交错的PDF文件，原文页面和译文页面交替出现"""
+        from PyPDF2 import PdfReader, PdfWriter
+
         temp_trans_path = None
     
         try:
@@ -502,7 +477,7 @@ class PDFTranslator:
                 temp_trans_path = temp_file.name
     
             # 创建译文页面
-            self._create_translation_pages(translated_texts, temp_trans_path)
+            self._create_translation_pages(translated_texts, temp_trans_path, progress_callback)
     
             # 检查临时文件是否成功创建
             if not os.path.exists(temp_trans_path):
@@ -546,152 +521,259 @@ class PDFTranslator:
                 except:
                     pass
 
-    def translate_pdf(self, input_file: str, output_file: str, target_language: str, show_comparison: bool = True):
-        """翻译PDF文档"""
+    def _translate_pages(self, extracted_texts: List[PageContent], target_language: str,
+                         progress_callback=None, job_id: str = None, glossary: Glossary = None) -> List[PageContent]:
+        """翻译所有页面的段落和表格，不直接操作界面，可在工作线程中调用"""
+        total_paragraphs = sum(len(page_content.paragraphs) for page_content in extracted_texts)
+        if job_id:
+            total_cells = sum(len(row) for page_content in extracted_texts
+                              for table in page_content.tables for row in table)
+            self.scheduler.add_work(job_id, total_paragraphs + total_cells)
+        done = 0
+        translated_texts = []
+        for page_content in extracted_texts:
+            translated_paragraphs = []
+            translated_tables = []
+
+            # 翻译段落
+            for para in page_content.paragraphs:
+                if para.text.strip():
+                    translated_text = self.translate_text(para.text, target_language, job_id, glossary)
+                    translated_paragraphs.append(Segment(translated_text, para.bbox))
+                else:
+                    translated_paragraphs.append(para)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total_paragraphs)
+
+            # 翻译表格
+            for table in page_content.tables:
+                translated_table = []
+                for row in table:
+                    translated_row = []
+                    for cell in row:
+                        if cell and cell.strip():
+                            translated_cell = self.translate_text(cell, target_language, job_id, glossary)
+                            translated_row.append(translated_cell)
+                        else:
+                            translated_row.append(cell)
+                    translated_table.append(translated_row)
+                translated_tables.append(translated_table)
+
+            # 组合翻译后的内容
+            translated_texts.append(PageContent(
+                page_content.page_num,
+                translated_paragraphs,
+                translated_tables,
+                page_content.images
+            ))
+        return translated_texts
+
+    def translate_pdf(self, input_file: str, output_file: str, target_language: str, show_comparison: bool = True,
+                      job_id: str = None, glossary: Glossary = None):
+        """翻译PDF文档；未指定job_id时由 translate_document 向调度器登记任务"""
+        return self.translate_document(input_file, output_file, target_language, show_comparison, 'pdf', job_id,
+                                       glossary)
+
+    def _render_translation(self, input_file: str, translated_texts: List[PageContent], output_file: str,
+                            show_comparison: bool, file_type: str, original_texts: List[PageContent] = None,
+                            progress_callback=None):
+        """按文件类型和对照模式生成译文文档"""
+        if file_type == 'pdf':
+            if show_comparison:
+                self.create_interleaved_pdf(input_file, translated_texts, output_file, progress_callback)
+            else:
+                self._create_translation_pages(translated_texts, output_file, progress_callback)
+        else:
+            if show_comparison:
+                self.create_interleaved_docx(input_file, translated_texts, output_file, original_texts)
+            else:
+                self.create_translated_docx(translated_texts, output_file)
+
+    def translate_document_multi(self, input_file: str, output_file: str, target_languages: List[str],
+                                 show_comparison: bool = True, file_type: str = 'pdf', max_workers: int = None,
+                                 job_id: str = None, glossary: Glossary = None):
+        """一次提取、多语言并发翻译与生成，结果打包为zip写入output_file"""
+        file_type = file_type.lower()
+        if file_type not in ('pdf', 'docx'):
+            raise Exception(f'不支持的文件类型：{file_type}')
+        if not target_languages:
+            raise Exception('未选择目标语言')
         try:
-            # 提取PDF文档内容
-            extracted_texts = self.extract_text_from_pdf(input_file)
-            
-            # 创建翻译进度条
-            total_paragraphs = sum(len(page_content["paragraphs"]) for _, page_content in extracted_texts)
+            # 只提取一次，所有语言共用
+            if file_type == 'pdf':
+                extracted_texts = self.extract_text_from_pdf(input_file)
+            else:
+                extracted_texts = self.extract_text_from_docx(input_file)
+            if file_type == 'pdf':
+                # 在主线程中预先注册字体，避免工作线程中操作界面
+                self._register_fonts()
+
+            total_paragraphs = sum(len(page_content.paragraphs) for page_content in extracted_texts)
+            total = max(total_paragraphs * len(target_languages), 1)
+            progress_by_lang = {lang: 0 for lang in target_languages}
+            lock = threading.Lock()
+            out_dir = tempfile.mkdtemp()
+            suffix = '.pdf' if file_type == 'pdf' else '.docx'
+            stem = os.path.splitext(os.path.basename(input_file))[0]
+
+            def run(lang):
+                def on_progress(done, _total):
+                    with lock:
+                        progress_by_lang[lang] = done
+                translated_texts = self._translate_pages(extracted_texts, lang, on_progress, job_id, glossary)
+                lang_output = os.path.join(out_dir, f"{stem}_{lang}{suffix}")
+                self._render_translation(input_file, translated_texts, lang_output, show_comparison, file_type,
+                                         extracted_texts)
+                return lang_output
+
             translate_progress = st.progress(0)
             translate_status = st.empty()
-            
-            # 翻译所有段落
-            translated_texts = []
-            for page_num, page_content in extracted_texts:
-                translated_paragraphs = []
-                translated_tables = []
-                
-                # 翻译段落
-                for i, para in enumerate(page_content["paragraphs"]):
-                    translate_status.text(f"正在翻译第 {i+1}/{total_paragraphs} 个段落...")
-                    translate_progress.progress((i+1) / total_paragraphs)
-                    
-                    if para["text"].strip():
-                        translated_text = self.translate_text(para["text"], target_language)
-                        translated_paragraphs.append({
-                            "text": translated_text,
-                            "bbox": para["bbox"]
-                        })
-                    else:
-                        translated_paragraphs.append(para)
-                
-                # 翻译表格
-                for table in page_content["tables"]:
-                    translated_table = []
-                    for row in table:
-                        translated_row = []
-                        for cell in row:
-                            if cell and cell.strip():
-                                translated_cell = self.translate_text(cell, target_language)
-                                translated_row.append(translated_cell)
-                            else:
-                                translated_row.append(cell)
-                        translated_table.append(translated_row)
-                    translated_tables.append(translated_table)
-                # 删除这行重复代码: translated_tables.append(translated_table)
-                
-                # 组合翻译后的内容
-                translated_page_content = {
-                    "paragraphs": translated_paragraphs,
-                    "tables": translated_tables,
-                    "images": page_content["images"]
-                }
-                translated_texts.append((page_num, translated_page_content))
-            
-            translate_status.text("翻译完成！正在生成PDF文档...")
-            
-            # 创建翻译后的PDF文档
-            if show_comparison:
-                self.create_interleaved_pdf(input_file, translated_texts, output_file)
-            else:
-                self._create_translation_pages(translated_texts, output_file)
-            
-            translate_status.text("PDF文档生成完成！")
+            try:
+                # 工作线程只负责翻译和生成，进度由主线程轮询刷新
+                with ThreadPoolExecutor(max_workers=max_workers or len(target_languages),
+                                        initializer=propagate()) as executor:
+                    pending = {executor.submit(run, lang): lang for lang in target_languages}
+                    outputs = {}
+                    try:
+                        while pending:
+                            finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                outputs[pending.pop(future)] = future.result()
+                            with lock:
+                                done = sum(progress_by_lang.values())
+                            translate_status.text(f"正在翻译 {len(target_languages)} 种语言：已完成 {len(outputs)} 种，"
+                                                  f"段落 {done}/{total}")
+                            translate_progress.progress(min(done / total, 1.0))
+                    except BaseException:
+                        # 出错或页面重跑时取消任务，让其余语言的排队请求立即结束
+                        if job_id:
+                            self.scheduler.cancel(job_id)
+                        raise
+
+                # 打包所有语言的结果
+                with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zf:
+                    for lang in target_languages:
+                        zf.write(outputs[lang], os.path.basename(outputs[lang]))
+            finally:
+                shutil.rmtree(out_dir, ignore_errors=True)
+
+            translate_status.text("多语言文档生成完成！")
             translate_progress.progress(1.0)
-            
             return True
-                
+
         except Exception as e:
             st.error(f"翻译失败: {str(e)}")
             raise Exception(f'文档翻译失败：{str(e)}')
 
-    def translate_document(self, input_file: str, output_file: str, target_language: str, show_comparison: bool = True, file_type: str = 'pdf'):
-        """翻译文档（支持PDF和Word文档）"""
+    def translate_document(self, input_file: str, output_file: str, target_language, show_comparison: bool = True,
+                           file_type: str = 'pdf', job_id: str = None, glossary: Glossary = None,
+                           profile_path: str = None):
+        """翻译文档（支持PDF和Word文档），target_language为列表时输出多语言zip
+
+        未指定job_id时自动向调度器登记任务，所有API请求都经调度器分配名额。
+        指定profile_path时对整个任务做性能分析，结束后（失败时也会）把分析结果zip写到该路径。
+        """
+        profiler = JobProfiler().start() if profile_path else None
+        own_job = job_id is None
+        if own_job:
+            job_id = self.scheduler.register_job()
+        try:
+            if isinstance(target_language, (list, tuple)):
+                return self.translate_document_multi(input_file, output_file, list(target_language), show_comparison,
+                                                     file_type, job_id=job_id, glossary=glossary)
+            return self._translate_single(input_file, output_file, target_language, show_comparison, file_type, job_id,
+                                          glossary)
+        finally:
+            if own_job:
+                self.scheduler.finish_job(job_id)
+            if profiler:
+                profiler.stop()
+                profiler.write(profile_path, name=os.path.basename(input_file))
+
+    def _translate_single(self, input_file: str, output_file: str, target_language: str, show_comparison: bool,
+                          file_type: str, job_id: str, glossary: Glossary = None):
+        """翻译单一目标语言的文档
+
+        提取在主线程完成；翻译和生成在工作线程中进行，主线程轮询刷新进度。
+        页面重跑（如点击“取消翻译”）会在轮询时中断主线程，此时取消任务，排队中的请求立即结束。
+        """
+        file_type = file_type.lower()
         try:
-            if file_type.lower() == 'pdf':
-                return self.translate_pdf(input_file, output_file, target_language, show_comparison)
-            elif file_type.lower() == 'docx':
-                # 提取Word文档内容
+            if file_type == 'pdf':
+                extracted_texts = self.extract_text_from_pdf(input_file)
+                # 在主线程中预先注册字体，避免工作线程中操作界面
+                self._register_fonts()
+                document_name = 'PDF文档'
+            elif file_type == 'docx':
                 extracted_texts = self.extract_text_from_docx(input_file)
-                
-                # 创建翻译进度条
-                total_paragraphs = sum(len(page_content["paragraphs"]) for _, page_content in extracted_texts)
-                translate_progress = st.progress(0)
-                translate_status = st.empty()
-                
-                # 翻译所有段落
-                translated_texts = []
-                for page_num, page_content in extracted_texts:
-                    translated_paragraphs = []
-                    translated_tables = []
-                    
-                    # 翻译段落
-                    for i, para in enumerate(page_content["paragraphs"]):
-                        translate_status.text(f"正在翻译第 {i+1}/{total_paragraphs} 个段落...")
-                        translate_progress.progress((i+1) / total_paragraphs)
-                        
-                        if para["text"].strip():
-                            translated_text = self.translate_text(para["text"], target_language)
-                            translated_paragraphs.append({
-                                "text": translated_text,
-                                "bbox": para["bbox"]
-                            })
-                        else:
-                            translated_paragraphs.append(para)
-                    
-                    # 翻译表格
-                    for table in page_content["tables"]:
-                        translated_table = []
-                        for row in table:
-                            translated_row = []
-                            for cell in row:
-                                if cell and cell.strip():
-                                    translated_cell = self.translate_text(cell, target_language)
-                                    translated_row.append(translated_cell)
-                                else:
-                                    translated_row.append(cell)
-                            translated_table.append(translated_row)
-                        translated_tables.append(translated_table)
-                    
-                    # 组合翻译后的内容
-                    translated_page_content = {
-                        "paragraphs": translated_paragraphs,
-                        "tables": translated_tables,
-                        "images": page_content["images"]
-                    }
-                    translated_texts.append((page_num, translated_page_content))
-                
-                translate_status.text("翻译完成！正在生成Word文档...")
-                
-                # 创建翻译后的Word文档
-                if show_comparison:
-                    self.create_interleaved_docx(input_file, translated_texts, output_file)
-                else:
-                    self.create_translated_docx(translated_texts, output_file)
-                
-                translate_status.text("Word文档生成完成！")
-                translate_progress.progress(1.0)
-                
-                return True
+                document_name = 'Word文档'
             else:
                 raise Exception(f'不支持的文件类型：{file_type}')
-                
+
+            # 进度状态：(阶段, 已完成, 总数)，由工作线程更新
+            state = ['translate', 0, 1]
+            lock = threading.Lock()
+
+            def on_progress(done, total):
+                with lock:
+                    state[:] = ['translate', done, total]
+
+            def on_render(done, total):
+                with lock:
+                    state[:] = ['render', done, total]
+
+            def run():
+                translated_texts = self._translate_pages(extracted_texts, target_language, on_progress, job_id,
+                                                         glossary)
+                on_render(0, 1)
+                self._render_translation(input_file, translated_texts, output_file, show_comparison, file_type,
+                                         extracted_texts, on_render)
+
+            translate_progress = st.progress(0)
+            translate_status = st.empty()
+            with ThreadPoolExecutor(max_workers=1, initializer=propagate()) as executor:
+                future = executor.submit(run)
+                try:
+                    while True:
+                        finished, _ = wait([future], timeout=0.5)
+                        with lock:
+                            stage, done, total = state
+                        if stage == 'translate':
+                            translate_status.text(f"正在翻译第 {done}/{total} 个段落...")
+                        else:
+                            translate_status.text(f"翻译完成！正在生成{document_name}：第 {done}/{total} 部分完成...")
+                        translate_progress.progress(min(done / total, 1.0) if total else 0.0)
+                        if finished:
+                            future.result()
+                            break
+                except BaseException:
+                    # 出错或页面重跑时取消任务，排队中的请求立即结束
+                    if job_id:
+                        self.scheduler.cancel(job_id)
+                    raise
+
+            translate_status.text(f"{document_name}生成完成！")
+            translate_progress.progress(1.0)
+            return True
+
         except Exception as e:
             st.error(f"翻译失败: {str(e)}")
             raise Exception(f'文档翻译失败：{str(e)}')
 
+_translator = None
+_translator_lock = threading.Lock()
+
+
+def get_translator() -> PDFTranslator:
+    """获取进程级 PDFTranslator 单例，避免每次任务重复加载配置、翻译记忆库和后端池"""
+    global _translator
+    with _translator_lock:
+        if _translator is None:
+            _translator = PDFTranslator()
+        return _translator
+
+
 def main():
     # 使用示例
     translator = PDFTranslator()
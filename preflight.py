@@ -0,0 +1,248 @@
+import os
+import io
+import re
+import zipfile
+from typing import List, Tuple
+
+from ocr import ocr_available
+
+# 估算所用的经验参数
+TOKENS_PER_CJK_CHAR = 0.7
+CHARS_PER_TOKEN_LATIN = 3.5
+PROMPT_OVERHEAD_TOKENS = 150  # 每次请求的系统提示词开销
+OUTPUT_TOKEN_RATIO = 1.2  # 译文与原文的 token 比例
+DOCX_CHARS_PER_PAGE = 1800
+OCR_CHARS_PER_PAGE = 1500  # 没有文本页可供抽样时，扫描页每页的识别字数（可用 PREFLIGHT_OCR_CHARS_PER_PAGE 覆盖）
+OCR_CHARS_PER_PARAGRAPH = 200
+
+_CJK_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯]')
+_RECT_OP_RE = re.compile(rb'\sre\s')
+_LINE_OP_RE = re.compile(rb'\sl\s')
+_INNER_TABLE_RE = re.compile(r'<w:tbl[\s>](?:(?!<w:tbl[\s>]).)*?</w:tbl>', re.S)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class PreflightReport:
+    """预检结果：文档结构统计与按目标语言数折算的资源预测"""
+
+    __slots__ = ('file_type', 'pages', 'chars', 'tokens', 'paragraphs', 'table_pages', 'table_cells',
+                 'scanned_pages', 'api_calls', 'cost', 'seconds', 'peak_memory_mb')
+
+    def __init__(self, file_type: str):
+        self.file_type = file_type
+        self.pages = 0
+        self.chars = 0
+        self.tokens = 0
+        self.paragraphs = 0
+        self.table_pages = 0
+        self.table_cells = 0
+        self.scanned_pages = 0
+        self.api_calls = 0
+        self.cost = 0.0
+        self.seconds = 0.0
+        self.peak_memory_mb = 0.0
+
+    @property
+    def table_density(self) -> float:
+        return self.table_pages / self.pages if self.pages else 0.0
+
+    @property
+    def scanned_ratio(self) -> float:
+        return self.scanned_pages / self.pages if self.pages else 0.0
+
+    def to_dict(self) -> dict:
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result['table_density'] = self.table_density
+        result['scanned_ratio'] = self.scanned_ratio
+        return result
+
+
+def _estimate_tokens(text: str) -> float:
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return cjk * TOKENS_PER_CJK_CHAR + other / CHARS_PER_TOKEN_LATIN
+
+
+def _sample_indices(total: int, sample_size: int) -> List[int]:
+    if total <= sample_size:
+        return list(range(total))
+    step = total / sample_size
+    return sorted({int(i * step) for i in range(sample_size)})
+
+
+_MAX_FORM_DEPTH = 8
+
+
+def _resource_structure(resources, visited: set, depth: int) -> Tuple[bool, int]:
+    """统计资源字典中的字体和图片，并递归进入 /Form XObject 自带的资源字典"""
+    if resources is None:
+        return False, 0
+    resources = resources.get_object()
+    has_font = bool(resources.get('/Font'))
+    images = 0
+    xobjects = resources.get('/XObject')
+    if not xobjects:
+        return has_font, images
+    for ref in xobjects.get_object().values():
+        # 同一对象可能被多次引用或循环引用，按间接对象编号只访问一次
+        key = getattr(ref, 'idnum', None) or id(ref)
+        if key in visited:
+            continue
+        visited.add(key)
+        xobject = ref.get_object()
+        subtype = xobject.get('/Subtype')
+        if subtype == '/Image':
+            images += 1
+        elif subtype == '/Form' and depth < _MAX_FORM_DEPTH:
+            form_font, form_images = _resource_structure(xobject.get('/Resources'), visited, depth + 1)
+            has_font = has_font or form_font
+            images += form_images
+    return has_font, images
+
+
+def _page_structure(page) -> Tuple[bool, int]:
+    """不解码内容流，仅读取资源字典（含 /Form XObject 的资源）：返回 (是否有字体, 图片数量)"""
+    return _resource_structure(page.get('/Resources'), set(), 0)
+
+
+def _analyze_pdf(data: bytes, report: PreflightReport, sample_size: int):
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    report.pages = len(reader.pages)
+
+    # 全部页面只读资源字典，判断扫描页
+    text_pages = []
+    for index, page in enumerate(reader.pages):
+        has_font, images = _page_structure(page)
+        if not has_font and images:
+            report.scanned_pages += 1
+        elif has_font:
+            text_pages.append(index)
+
+    # 抽样页面提取文本和内容流，外推全文字数、段落和表格
+    sample = [text_pages[i] for i in _sample_indices(len(text_pages), sample_size)]
+    sample_chars = sample_tokens = sample_paragraphs = sample_table_pages = sample_cells = 0
+    for index in sample:
+        page = reader.pages[index]
+        text = page.extract_text() or ''
+        sample_chars += len(text)
+        sample_tokens += _estimate_tokens(text)
+        sample_paragraphs += max(1, len([p for p in text.split('\n\n') if p.strip()]))
+        contents = page.get_contents()
+        stream = contents.get_data() if contents is not None else b''
+        rects = len(_RECT_OP_RE.findall(stream))
+        lines = len(_LINE_OP_RE.findall(stream))
+        if rects + lines >= 4:
+            sample_table_pages += 1
+            sample_cells += max(rects, lines // 2)
+
+    if sample:
+        scale = len(text_pages) / len(sample)
+        report.chars = int(sample_chars * scale)
+        report.tokens = int(sample_tokens * scale)
+        report.paragraphs = int(sample_paragraphs * scale)
+        report.table_pages = int(sample_table_pages * scale)
+        report.table_cells = int(sample_cells * scale)
+
+    # 可用OCR时扫描页也会识别后翻译：按抽样文本页的每页平均值估算；全部为扫描页时按配置的每页字数估算，
+    # 语言未知，token 按中日韩字符计（偏高）
+    if report.scanned_pages and ocr_available():
+        if sample:
+            scale = report.scanned_pages / len(sample)
+            report.chars += int(sample_chars * scale)
+            report.tokens += int(sample_tokens * scale)
+            report.paragraphs += int(sample_paragraphs * scale)
+        else:
+            chars = int(_env_float('PREFLIGHT_OCR_CHARS_PER_PAGE', OCR_CHARS_PER_PAGE) * report.scanned_pages)
+            report.chars += chars
+            report.tokens += int(chars * TOKENS_PER_CJK_CHAR)
+            report.paragraphs += max(report.scanned_pages, chars // OCR_CHARS_PER_PARAGRAPH)
+
+
+def _analyze_docx(data: bytes, report: PreflightReport):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        xml = zf.read('word/document.xml').decode('utf-8', errors='ignore')
+    texts = re.findall(r'<w:t(?:\s[^>]*)?>([^<]*)</w:t>', xml)
+    text = ''.join(texts)
+    report.chars = len(text)
+    report.tokens = int(_estimate_tokens(text))
+    # 表格内的段落按单元格计入 table_cells，这里只统计表格外的段落
+    body, removed = xml, 1
+    while removed:  # 由内向外去掉表格，兼容嵌套表格
+        body, removed = _INNER_TABLE_RE.subn('', body)
+    report.paragraphs = len(re.findall(r'<w:p[\s>](?:(?!</w:p>).)*?<w:t[\s>]', body, re.S))
+    report.table_cells = len(re.findall(r'<w:tc[\s>]', xml))
+    report.table_pages = len(re.findall(r'<w:tbl[\s>]', xml))
+    report.pages = max(1, report.chars // DOCX_CHARS_PER_PAGE)
+
+
+def analyze_document(data: bytes, file_type: str, num_languages: int = 1, concurrency: int = None,
+                     sample_size: int = 20) -> PreflightReport:
+    """预检文档：只读取PDF结构（PdfReader）或DOCX的XML，预测API调用、费用、耗时和峰值内存
+
+    费用按 PREFLIGHT_INPUT_PRICE / PREFLIGHT_OUTPUT_PRICE（每百万token，元）计算，
+    耗时按 PREFLIGHT_AVG_LATENCY（单次请求秒数）和并发数估算。
+    """
+    report = PreflightReport(file_type)
+    if file_type == 'pdf':
+        _analyze_pdf(data, report, sample_size)
+    elif file_type == 'docx':
+        _analyze_docx(data, report)
+    else:
+        raise ValueError(f"不支持的文件类型：{file_type}")
+
+    calls = report.paragraphs + report.table_cells
+    report.api_calls = calls * num_languages
+    input_tokens = (report.tokens + calls * PROMPT_OVERHEAD_TOKENS) * num_languages
+    output_tokens = report.tokens * OUTPUT_TOKEN_RATIO * num_languages
+    report.cost = (input_tokens * _env_float('PREFLIGHT_INPUT_PRICE', 2.0)
+                   + output_tokens * _env_float('PREFLIGHT_OUTPUT_PRICE', 8.0)) / 1_000_000
+
+    if concurrency is None:
+        concurrency = int(os.getenv('TRANSLATION_MAX_CONCURRENCY', '8'))
+    # 单个语言的段落按顺序翻译，多语言之间并发
+    parallel = max(1, min(concurrency, num_languages))
+    latency = _env_float('PREFLIGHT_AVG_LATENCY', 3.0)
+    cpus = os.cpu_count() or 1
+    report.seconds = (report.api_calls * latency / parallel
+                      + report.pages * 0.05  # 文本提取
+                      + report.scanned_pages * 2.0 / cpus  # OCR
+                      + report.pages * 0.02 * num_languages)  # 排版
+
+    # 峰值内存：基础进程 + 原文件多份副本 + 每页的段落对象和排版分块
+    report.peak_memory_mb = 150 + len(data) / 1024 / 1024 * 3 + report.pages * 0.1 * (1 + num_languages)
+    return report
+
+
+def assess(report: PreflightReport) -> Tuple[str, List[str]]:
+    """根据阈值给出处理建议：'ok'、'warn'（提示后可继续）或 'reject'（拒绝执行）"""
+    limits = [
+        ('pages', report.pages, 'PREFLIGHT_WARN_PAGES', 300, 'PREFLIGHT_MAX_PAGES', 3000, '页数 {:.0f}'),
+        ('cost', report.cost, 'PREFLIGHT_WARN_COST', 20, 'PREFLIGHT_MAX_COST', 200, '预计费用 {:.2f} 元'),
+        ('seconds', report.seconds / 60, 'PREFLIGHT_WARN_MINUTES', 30, 'PREFLIGHT_MAX_MINUTES', 240,
+         '预计耗时 {:.0f} 分钟'),
+        ('memory', report.peak_memory_mb, 'PREFLIGHT_WARN_MEMORY_MB', 2048, 'PREFLIGHT_MAX_MEMORY_MB', 8192,
+         '预计峰值内存 {:.0f} MB'),
+    ]
+    level = 'ok'
+    messages = []
+    for _, value, warn_env, warn_default, max_env, max_default, template in limits:
+        if value > _env_float(max_env, max_default):
+            level = 'reject'
+            messages.append(template.format(value) + ' 超出上限')
+        elif value > _env_float(warn_env, warn_default):
+            if level == 'ok':
+                level = 'warn'
+            messages.append(template.format(value) + ' 较高')
+    if report.scanned_ratio > 0.5:
+        if level == 'ok':
+            level = 'warn'
+        messages.append(f"扫描页占比 {report.scanned_ratio:.0%}，需要OCR识别")
+    return level, messages
@@ -0,0 +1,234 @@
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import zipfile
+import tempfile
+import threading
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# tracemalloc 为进程级开关：多个任务同时分析时按引用计数启停
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _start_tracemalloc(frames: int):
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _tracemalloc_users += 1
+
+
+# 线程到分析任务的映射：只采样属于任务的线程
+_thread_profilers: Dict[int, 'JobProfiler'] = {}
+_threads_lock = threading.Lock()
+
+
+def propagate() -> Optional[Callable[[], None]]:
+    """返回线程池的 initializer，使工作线程加入当前线程所属的分析任务；当前线程未在分析时返回 None
+
+    用法：ThreadPoolExecutor(max_workers=n, initializer=propagate())
+    """
+    with _threads_lock:
+        profiler = _thread_profilers.get(threading.get_ident())
+    return profiler.add_current_thread if profiler else None
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class JobProfiler:
+    """单个任务的性能分析：cProfile 确定性分析、全线程采样（speedscope 火焰图）和 tracemalloc 内存分配
+
+    cProfile 只覆盖调用 start() 的线程；采样线程通过 sys._current_frames 覆盖任务的所有线程：
+    调用 start() 的线程，以及以 propagate() 为 initializer 的线程池工作线程（翻译、生成）。
+    共享线程池（如对冲请求）和 OCR、排版子进程不在采样范围内，表现为等待 future 的耗时。
+    tracemalloc 对分配密集的代码开销可达十倍以上，可用 trace_allocations=False 关闭。
+    用法：with JobProfiler() as profiler: ...；结束后 write(path) 输出 zip。
+    """
+
+    def __init__(self, interval: Optional[float] = None, deterministic: bool = True,
+                 trace_allocations: bool = True, trace_frames: int = 5, top_allocations: int = 30):
+        self.interval = interval or float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+        self.deterministic = deterministic
+        self.trace_allocations = trace_allocations
+        self.trace_frames = trace_frames
+        self.top_allocations = top_allocations
+        self._profile = None
+        self._sampler = None
+        self._stop_event = threading.Event()
+        self._threads: Set[int] = set()
+        # 采样结果：帧表与每个线程的调用栈序列及对应权重，连续相同的调用栈合并为一项
+        self._frames: List[Tuple[str, str, int]] = []
+        self._frame_index: Dict[tuple, int] = {}
+        self._samples: Dict[int, Tuple[List[tuple], List[float]]] = {}
+        self._stacks: Dict[tuple, tuple] = {}  # 相同调用栈只保留一份，便于按对象身份合并
+        self._thread_names: Dict[int, str] = {}
+        self._snapshot = None
+        self._peak_memory = 0
+        self.started = None
+        self.elapsed = 0.0
+
+    def add_current_thread(self):
+        """把当前线程加入采样范围"""
+        ident = threading.get_ident()
+        with _threads_lock:
+            self._threads.add(ident)
+            _thread_profilers[ident] = self
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.add_current_thread()
+        if self.trace_allocations:
+            _start_tracemalloc(self.trace_frames)
+            tracemalloc.reset_peak()
+        self._sampler = threading.Thread(target=self._sample_loop, name='job-profiler', daemon=True)
+        self._sampler.start()
+        if self.deterministic:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # 已有其他分析器在运行（如并发任务的 cProfile），仅保留采样结果
+                self._profile = None
+        return self
+
+    def stop(self):
+        if self.started is None or self._sampler is None:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+        self._stop_event.set()
+        self._sampler.join()
+        self._sampler = None
+        with _threads_lock:
+            for ident in self._threads:
+                if _thread_profilers.get(ident) is self:
+                    del _thread_profilers[ident]
+        if self.trace_allocations:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak_memory = tracemalloc.get_traced_memory()[1]
+            _stop_tracemalloc()
+        self.elapsed = time.perf_counter() - self.started
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _frame_id(self, code) -> int:
+        key = (getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = len(self._frames)
+            self._frame_index[key] = index
+            self._frames.append(key)
+        return index
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            weight = now - last
+            last = now
+            with _threads_lock:
+                threads = list(self._threads)
+            frames = sys._current_frames()
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                if thread_id not in self._thread_names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    self._thread_names[thread_id] = names.get(thread_id, str(thread_id))
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                stack = tuple(stack)
+                stack = self._stacks.setdefault(stack, stack)
+                stacks, weights = self._samples.setdefault(thread_id, ([], []))
+                if stacks and stacks[-1] is stack:
+                    weights[-1] += weight
+                else:
+                    stacks.append(stack)
+                    weights.append(weight)
+
+    def speedscope(self, name: str = 'job') -> dict:
+        """按线程输出 speedscope 采样格式（https://www.speedscope.app）"""
+        profiles = []
+        for thread_id, (stacks, weights) in self._samples.items():
+            profiles.append({
+                'type': 'sampled',
+                'name': self._thread_names.get(thread_id, str(thread_id)),
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': stacks,
+                'weights': weights,
+            })
+        # 采样时间最长的线程排在前面
+        profiles.sort(key=lambda p: p['endValue'], reverse=True)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'pdf_translator.profiling',
+            'activeProfileIndex': 0,
+            'shared': {'frames': [{'name': n, 'file': f, 'line': line} for n, f, line in self._frames]},
+            'profiles': profiles,
+        }
+
+    def allocation_report(self) -> str:
+        """按分配位置汇总的内存占用（任务结束时仍存活的对象）及峰值"""
+        if self._snapshot is None:
+            return '未记录内存分配'
+        lines = [f"峰值已跟踪内存：{self._peak_memory / 1024 / 1024:.1f} MB", '']
+        for stat in self._snapshot.statistics('traceback')[:self.top_allocations]:
+            lines.append(f"{stat.size / 1024:.1f} KiB，{stat.count} 个对象")
+            lines.extend('    ' + line for line in stat.traceback.format())
+        return '\n'.join(lines)
+
+    def stats_text(self, limit: int = 60) -> str:
+        if self._profile is None:
+            return '未收集确定性分析数据（另一个分析器正在运行）'
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(limit)
+        stats.sort_stats('tottime').print_stats(limit)
+        return out.getvalue()
+
+    def to_zip(self, name: str = 'job') -> bytes:
+        """打包 profile.pstats、profile.txt、speedscope.json 和 allocations.txt"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            if self._profile is not None:
+                # pstats 只能写到文件路径，先写临时文件再放进 zip
+                fd, stats_path = tempfile.mkstemp(suffix='.pstats')
+                os.close(fd)
+                try:
+                    self._profile.dump_stats(stats_path)
+                    zf.write(stats_path, 'profile.pstats')
+                finally:
+                    os.unlink(stats_path)
+            zf.writestr('profile.txt', f"总耗时：{self.elapsed:.2f}s\n\n" + self.stats_text())
+            zf.writestr('speedscope.json', json.dumps(self.speedscope(name)))
+            zf.writestr('allocations.txt', self.allocation_report())
+        return buffer.getvalue()
+
+    def write(self, path: str, name: str = 'job'):
+        with open(path, 'wb') as f:
+            f.write(self.to_zip(name))
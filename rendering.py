@@ -0,0 +1,260 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+from segments import PageContent, dumps_pages, loads_pages
+
+# reportlab 排版按页对齐分块：每块在独立进程中生成PDF，最后按顺序拼接
+DEFAULT_CHUNK_PAGES = 50
+
+
+def _ensure_font(font_name: str, font_path: Optional[str]):
+    """在工作进程中注册字体（主进程中已注册时直接返回）"""
+    if not font_path:
+        return
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    if font_name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(font_name, font_path))
+
+
+def _translation_story(pages: List[PageContent], font_name: str) -> list:
+    """仅译文：每页段落与表格，页间分页，无提示性标题"""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, PageBreak
+    from reportlab.lib import colors
+
+    styles = getSampleStyleSheet()
+    translated_style = ParagraphStyle(
+        'TranslatedText',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=12,
+        leading=18,
+        spaceBefore=6,
+        spaceAfter=6,
+        alignment=0  # 左对齐
+    )
+
+    story = []
+    for i, page_content in enumerate(pages):
+        if i > 0:
+            story.append(PageBreak())
+
+        # 仅添加译文段落（不再添加“第 X 页译文”等标题）
+        for para in page_content.paragraphs:
+            text = (para.text or "").strip()
+            if text:
+                story.append(Paragraph(text, translated_style))
+                story.append(Spacer(1, 8))
+
+        # 表格（不添加“表格数据”、“表格 X”等提示）
+        for table_data in page_content.tables:
+            if table_data:
+                table = Table(table_data, repeatRows=0)
+                table.setStyle(TableStyle([
+                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                    ('FONTNAME', (0, 0), (-1, -1), font_name),
+                    ('FONTSIZE', (0, 0), (-1, -1), 10),
+                    ('PADDING', (0, 0), (-1, -1), 6),
+                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ]))
+                story.append(table)
+                story.append(Spacer(1, 12))
+    return story
+
+
+def _comparison_story(original_pages: List[PageContent], translated_pages: List[PageContent],
+                      font_name: str, show_comparison: bool) -> list:
+    """原文译文对照：按段落依次排列原文（灰色）和译文"""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib import colors
+
+    styles = getSampleStyleSheet()
+    original_style = ParagraphStyle(
+        'OriginalText',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=11,
+        leading=16,
+        spaceAfter=6,
+        alignment=0,  # 左对齐
+        textColor='#666666'
+    )
+    translated_style = ParagraphStyle(
+        'TranslatedText',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=12,
+        leading=18,
+        spaceAfter=12,
+        alignment=0  # 左对齐
+    )
+
+    story = []
+    for orig_content, trans_content in zip(original_pages, translated_pages):
+        # 处理段落
+        for orig_para, trans_para in zip(orig_content.paragraphs, trans_content.paragraphs):
+            if show_comparison:
+                # 添加原文
+                if orig_para.text.strip():
+                    story.append(Paragraph(orig_para.text.strip(), original_style))
+                # 添加译文
+                if trans_para.text.strip():
+                    story.append(Paragraph(trans_para.text.strip(), translated_style))
+            else:
+                # 仅显示译文
+                if trans_para.text.strip():
+                    story.append(Paragraph(trans_para.text.strip(), translated_style))
+
+        story.append(Spacer(1, 12))  # 段落间距
+
+        # 添加表格
+        for table in orig_content.tables:
+            table_data = [[Paragraph(cell or "", original_style) for cell in row] for row in table]
+            table_obj = Table(table_data)
+            table_obj.setStyle(TableStyle([
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+                ('FONTNAME', (0, 0), (-1, -1), font_name),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ]))
+            story.append(table_obj)
+            story.append(Spacer(1, 12))
+    return story
+
+
+def _build_pdf(story: list, output_path: str):
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import letter
+
+    doc = SimpleDocTemplate(
+        output_path,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+    doc.build(story)
+
+
+def _render(kind: str, page_lists: List[List[PageContent]], output_path: str, font_name: str,
+            show_comparison: bool):
+    if kind == 'translation':
+        story = _translation_story(page_lists[0], font_name)
+    elif kind == 'comparison':
+        story = _comparison_story(page_lists[0], page_lists[1], font_name, show_comparison)
+    else:
+        raise ValueError(f"未知的排版类型：{kind}")
+    _build_pdf(story, output_path)
+
+
+def render_chunk(kind: str, payloads: List[bytes], output_path: str, font_name: str,
+                 font_path: Optional[str] = None, show_comparison: bool = True) -> str:
+    """在工作进程中生成一个分块的PDF；payloads 为 dumps_pages 序列化后的页面"""
+    _ensure_font(font_name, font_path)
+    _render(kind, [loads_pages(payload) for payload in payloads], output_path, font_name, show_comparison)
+    return output_path
+
+
+def _concat_pdfs(paths: List[str], output_path: str):
+    from PyPDF2 import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for path in paths:
+        for page in PdfReader(path).pages:
+            writer.add_page(page)
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_workers = 0
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """获取进程级排版进程池，大小为 RENDER_MAX_WORKERS（默认CPU核数）；多个任务同时排版时共享，总进程数不超过上限"""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool_workers = int(os.getenv('RENDER_MAX_WORKERS', '0')) or os.cpu_count() or 1
+            _render_pool = ProcessPoolExecutor(max_workers=_render_pool_workers)
+        return _render_pool
+
+
+def _discard_render_pool(pool: ProcessPoolExecutor):
+    """工作进程异常退出后进程池不可再用，丢弃后下次调用重新创建"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_pages(kind: str, page_lists: List[List[PageContent]], output_path: str, font_name: str,
+                 font_path: Optional[str] = None, show_comparison: bool = True,
+                 chunk_pages: Optional[int] = None, max_workers: Optional[int] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None):
+    """按页对齐分块并行排版后拼接为一个PDF
+
+    page_lists 为一个（仅译文）或两个（原文、译文）页面列表；分块大小由 RENDER_CHUNK_PAGES 配置，
+    页数不超过一个分块时直接在当前进程生成。每块从新页开始排版，内存占用随分块大小而非文档大小增长。
+    分块在进程级共享进程池（get_render_pool）中生成，max_workers 限制本次调用同时占用的工作进程数。
+    """
+    chunk_pages = chunk_pages or int(os.getenv('RENDER_CHUNK_PAGES', DEFAULT_CHUNK_PAGES))
+    total_pages = len(page_lists[0])
+    starts = list(range(0, total_pages, chunk_pages)) or [0]
+    total_chunks = len(starts)
+
+    if total_chunks == 1:
+        _render(kind, page_lists, output_path, font_name, show_comparison)
+        if progress_callback:
+            progress_callback(1, 1)
+        return
+
+    pool = get_render_pool()
+    # 每次调用同时提交的分块数不超过 max_workers（默认为进程池大小），并发任务轮流使用共享进程池，
+    # 尚未提交的分块也不会提前序列化占用内存
+    max_workers = min(max_workers or _render_pool_workers, total_chunks)
+
+    chunk_dir = tempfile.mkdtemp()
+    try:
+        chunk_paths = [os.path.join(chunk_dir, f"chunk_{i:05d}.pdf") for i in range(total_chunks)]
+        pending = set()
+        done = 0
+
+        def collect():
+            nonlocal pending, done
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                future.result()
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total_chunks)
+
+        try:
+            for i, start in enumerate(starts):
+                if len(pending) >= max_workers:
+                    collect()
+                payloads = [dumps_pages(pages[start:start + chunk_pages]) for pages in page_lists]
+                pending.add(pool.submit(render_chunk, kind, payloads, chunk_paths[i], font_name,
+                                        font_path, show_comparison))
+            while pending:
+                collect()
+        except BrokenProcessPool:
+            _discard_render_pool(pool)
+            raise
+        finally:
+            # 出错或被中断时取消本次尚未开始的分块，不影响其他任务
+            for future in pending:
+                future.cancel()
+        _concat_pdfs(chunk_paths, output_path)
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
@@ -0,0 +1,102 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'results')
+
+
+class ResultCache:
+    """按内容寻址的翻译结果缓存
+
+    键由输入文件内容和所有影响输出的选项共同决定；写入采用临时文件+原子替换，
+    多个会话可安全共享同一目录；总大小超过上限时按最近访问时间淘汰。
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = root or os.getenv('RESULT_CACHE_DIR') or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = int(os.getenv('RESULT_CACHE_MAX_MB', '1024')) * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def make_key(data: bytes, **options) -> str:
+        """计算缓存键：输入内容哈希 + 选项（语言、对照模式、保版式、引擎版本等）"""
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(options, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        directory = os.path.join(self.root, key[:2])
+        return os.path.join(directory, f"{key}.bin"), os.path.join(directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        """命中时返回 (结果内容, 元数据)，并刷新访问时间"""
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(data_path, 'rb') as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(data_path)
+        except OSError:
+            pass
+        return data, meta
+
+    def _atomic_write(self, path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def put(self, key: str, data: bytes, meta: Optional[dict] = None):
+        """写入结果；先写内容再写元数据，读取时元数据存在即代表内容完整"""
+        data_path, meta_path = self._paths(key)
+        self._atomic_write(data_path, data)
+        self._atomic_write(meta_path, json.dumps(meta or {}, ensure_ascii=False).encode('utf-8'))
+        self._evict()
+
+    def _evict(self):
+        """总大小超过上限时，删除最久未访问的结果"""
+        with self._lock:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.root):
+                for name in files:
+                    if not name.endswith('.bin'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                for p in (path[:-4] + '.json', path):
+                    try:
+                        os.unlink(p)
+                    except OSError:
+                        pass
+                total -= size
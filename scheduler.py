@@ -0,0 +1,187 @@
+import os
+import heapq
+import itertools
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class JobCancelled(Exception):
+    """任务已被取消，排队中的请求不再发送"""
+
+
+class _Job:
+    __slots__ = ('job_id', 'owner', 'base_weight', 'weight', 'size', 'finish_tag', 'cancelled',
+                 'in_flight', 'completed')
+
+    def __init__(self, job_id: str, owner: str, weight: float):
+        self.job_id = job_id
+        self.owner = owner
+        self.base_weight = weight
+        self.weight = weight
+        self.size = 0  # 预计请求数（段落数）
+        self.finish_tag = 0.0  # 该任务最近一个请求的虚拟完成时间
+        self.cancelled = False
+        self.in_flight = 0
+        self.completed = 0
+
+
+class _Ticket:
+    __slots__ = ('job', 'granted')
+
+    def __init__(self, job: _Job):
+        self.job = job
+        self.granted = False
+
+
+class TranslationScheduler:
+    """进程内全局的API并发调度器
+
+    所有会话的翻译请求都需先申请名额，名额总数即API并发预算。
+    等待中的请求按加权公平排队（虚拟完成时间最小者优先）分配名额，
+    小任务获得更高权重以保证交互体验；取消任务会立即丢弃其排队请求。
+    """
+
+    def __init__(self, capacity: int = 8, small_job_size: int = 50, small_job_boost: float = 4.0):
+        self.capacity = capacity
+        self.small_job_size = small_job_size
+        self.small_job_boost = small_job_boost
+        self._cond = threading.Condition()
+        self._jobs: Dict[str, _Job] = {}
+        self._queue = []  # (虚拟完成时间, 序号, 票据)
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+
+    def register_job(self, owner: str = '', weight: float = 1.0, size: int = 0) -> str:
+        """登记一个翻译任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        with self._cond:
+            job = _Job(job_id, owner, weight)
+            self._jobs[job_id] = job
+            self._update_weight(job, size)
+        return job_id
+
+    def add_work(self, job_id: str, size: int):
+        """追加任务的预计请求数，用于判断是否属于小任务"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job:
+                self._update_weight(job, job.size + size)
+
+    def _update_weight(self, job: _Job, size: int):
+        job.size = size
+        boost = self.small_job_boost if size <= self.small_job_size else 1.0
+        job.weight = job.base_weight * boost
+
+    def finish_job(self, job_id: str):
+        """任务结束后注销"""
+        with self._cond:
+            self._jobs.pop(job_id, None)
+
+    def cancel(self, job_id: str):
+        """取消任务：排队中的请求立即失败，已发出的请求不受影响"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job:
+                job.cancelled = True
+                self._queue = [item for item in self._queue if item[2].job is not job]
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def is_cancelled(self, job_id: str) -> bool:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return bool(job and job.cancelled)
+
+    def set_capacity(self, capacity: int):
+        """调整并发预算"""
+        with self._cond:
+            self.capacity = max(1, int(capacity))
+            self._dispatch()
+
+    def take_peak_in_flight(self) -> int:
+        """返回自上次调用以来同时在途请求数的峰值，并从当前在途数重新统计"""
+        with self._cond:
+            peak = self._peak_in_flight
+            self._peak_in_flight = self._in_flight
+            return peak
+
+    def _dispatch(self):
+        while self._in_flight < self.capacity and self._queue:
+            tag, _, ticket = heapq.heappop(self._queue)
+            if ticket.job.cancelled:
+                continue
+            ticket.granted = True
+            ticket.job.in_flight += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            self._virtual_time = tag
+        self._cond.notify_all()
+
+    def acquire(self, job_id: str):
+        """为任务申请一个请求名额，名额不足时阻塞等待"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(f"未登记的任务：{job_id}")
+            if job.cancelled:
+                raise JobCancelled('任务已取消')
+            job.finish_tag = max(self._virtual_time, job.finish_tag) + 1.0 / job.weight
+            ticket = _Ticket(job)
+            heapq.heappush(self._queue, (job.finish_tag, next(self._seq), ticket))
+            self._dispatch()
+            while not ticket.granted:
+                if job.cancelled:
+                    raise JobCancelled('任务已取消')
+                self._cond.wait()
+
+    def release(self, job_id: str):
+        """归还名额"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job:
+                job.in_flight -= 1
+                job.completed += 1
+            self._in_flight -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, job_id: str):
+        self.acquire(job_id)
+        try:
+            yield
+        finally:
+            self.release(job_id)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'in_flight': self._in_flight,
+                'queued': len(self._queue),
+                'jobs': [{
+                    'job_id': job.job_id,
+                    'owner': job.owner,
+                    'weight': job.weight,
+                    'size': job.size,
+                    'in_flight': job.in_flight,
+                    'completed': job.completed,
+                    'cancelled': job.cancelled,
+                } for job in self._jobs.values()],
+            }
+
+
+_scheduler: Optional[TranslationScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> TranslationScheduler:
+    """获取进程级调度器单例，并发预算由 TRANSLATION_MAX_CONCURRENCY 配置"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TranslationScheduler(capacity=int(os.getenv('TRANSLATION_MAX_CONCURRENCY', '8')))
+        return _scheduler
@@ -0,0 +1,127 @@
+import struct
+from typing import List, Optional, Tuple
+
+# 页面内容的紧凑表示：使用 __slots__ 记录代替嵌套字典，并提供二进制序列化用于进程间传递
+
+_MAGIC = b'SEG1'
+_U32 = struct.Struct('<I')
+_I32 = struct.Struct('<i')
+_BBOX = struct.Struct('<4d')
+
+
+class Segment:
+    """一个文本段落，bbox 为 (x0, top, x1, bottom) 或 None"""
+
+    __slots__ = ('text', 'bbox')
+
+    def __init__(self, text: str, bbox: Optional[Tuple[float, float, float, float]] = None):
+        self.text = text
+        self.bbox = bbox
+
+    def __repr__(self):
+        return f"Segment({self.text!r}, bbox={self.bbox!r})"
+
+
+class PageContent:
+    """一页内容：段落、表格（单元格可为 None）和图片位置"""
+
+    __slots__ = ('page_num', 'paragraphs', 'tables', 'images')
+
+    def __init__(self, page_num: int, paragraphs: List[Segment] = None,
+                 tables: List[List[List[Optional[str]]]] = None,
+                 images: List[Tuple[float, float, float, float]] = None):
+        self.page_num = page_num
+        self.paragraphs = paragraphs if paragraphs is not None else []
+        self.tables = tables if tables is not None else []
+        self.images = images if images is not None else []
+
+    def __repr__(self):
+        return (f"PageContent(page_num={self.page_num}, paragraphs={len(self.paragraphs)}, "
+                f"tables={len(self.tables)}, images={len(self.images)})")
+
+
+def image_bbox(image: dict) -> Tuple[float, float, float, float]:
+    """将提取后端返回的图片字典转换为 (x0, top, x1, bottom)"""
+    return (float(image['x0']), float(image['top']), float(image['x1']), float(image['bottom']))
+
+
+def _pack_str(out: bytearray, value: Optional[str]):
+    if value is None:
+        out += _I32.pack(-1)
+        return
+    data = value.encode('utf-8')
+    out += _I32.pack(len(data))
+    out += data
+
+
+def dumps_pages(pages: List[PageContent]) -> bytes:
+    """将页面列表序列化为紧凑的二进制格式"""
+    out = bytearray(_MAGIC)
+    out += _U32.pack(len(pages))
+    for page in pages:
+        out += _U32.pack(page.page_num)
+        out += _U32.pack(len(page.paragraphs))
+        for para in page.paragraphs:
+            if para.bbox is None:
+                out.append(0)
+            else:
+                out.append(1)
+                out += _BBOX.pack(*para.bbox)
+            _pack_str(out, para.text)
+        out += _U32.pack(len(page.tables))
+        for table in page.tables:
+            out += _U32.pack(len(table))
+            for row in table:
+                out += _U32.pack(len(row))
+                for cell in row:
+                    _pack_str(out, cell)
+        out += _U32.pack(len(page.images))
+        for bbox in page.images:
+            out += _BBOX.pack(*bbox)
+    return bytes(out)
+
+
+def loads_pages(data: bytes) -> List[PageContent]:
+    """从 dumps_pages 的输出还原页面列表"""
+    view = memoryview(data)
+    if bytes(view[:4]) != _MAGIC:
+        raise ValueError("无效的页面序列化数据")
+    pos = 4
+
+    def u32():
+        nonlocal pos
+        value = _U32.unpack_from(view, pos)[0]
+        pos += 4
+        return value
+
+    def string():
+        nonlocal pos
+        length = _I32.unpack_from(view, pos)[0]
+        pos += 4
+        if length < 0:
+            return None
+        value = bytes(view[pos:pos + length]).decode('utf-8')
+        pos += length
+        return value
+
+    def bbox():
+        nonlocal pos
+        value = _BBOX.unpack_from(view, pos)
+        pos += _BBOX.size
+        return value
+
+    pages = []
+    for _ in range(u32()):
+        page_num = u32()
+        paragraphs = []
+        for _ in range(u32()):
+            has_bbox = view[pos]
+            pos += 1
+            para_bbox = bbox() if has_bbox else None
+            paragraphs.append(Segment(string(), para_bbox))
+        tables = []
+        for _ in range(u32()):
+            tables.append([[string() for _ in range(u32())] for _ in range(u32())])
+        images = [bbox() for _ in range(u32())]
+        pages.append(PageContent(page_num, paragraphs, tables, images))
+    return pages
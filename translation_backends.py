@@ -0,0 +1,269 @@
+import os
+import json
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_API_URL = 'https://api.siliconflow.cn/v1/chat/completions'
+DEFAULT_MODEL = 'deepseek-ai/DeepSeek-V3'
+
+
+def _source_text(messages: List[dict]) -> str:
+    """待翻译的原文段落：最后一条消息的 source 字段（如“修改参考译文”请求），没有时为消息内容"""
+    message = messages[-1]
+    return message.get('source', message['content'])
+
+
+class TranslationBackend:
+    """翻译后端基类：接收对话消息，返回模型输出文本
+
+    消息可带 source 字段存放待翻译的原文段落，在线接口只发送 role 和 content。
+    """
+
+    # 译文是否可写入翻译记忆库；回显、词典等替身后端的输出不是真实译文，不应被复用
+    cacheable = True
+
+    def __init__(self, name: str, weight: float = 1.0):
+        self.name = name
+        self.weight = weight
+
+    def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> str:
+        raise NotImplementedError
+
+
+class OpenAICompatibleBackend(TranslationBackend):
+    """兼容 OpenAI chat/completions 协议的在线接口（如 SiliconFlow、DeepSeek）"""
+
+    def __init__(self, api_url: str, api_key: str, model: str, weight: float = 1.0,
+                 session=None, timeout: float = 120, name: str = None):
+        super().__init__(name or f"{model}@{api_url}", weight)
+        self.api_url = api_url
+        self.model = model
+        self.timeout = timeout
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        self.headers = {
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        }
+
+    def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> str:
+        response = self.session.post(
+            self.api_url,
+            headers=self.headers,
+            json={
+                'model': self.model,
+                'messages': [{'role': m['role'], 'content': m['content']} for m in messages],
+                'max_tokens': max_tokens,
+                'temperature': temperature
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        result = response.json()
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"].strip()
+        raise Exception("翻译API返回的结果格式不正确")
+
+
+class EchoBackend(TranslationBackend):
+    """本地回显后端：原样返回待翻译的原文，用于测试和离线运行"""
+
+    cacheable = False
+
+    def __init__(self, weight: float = 1.0, name: str = 'echo'):
+        super().__init__(name, weight)
+
+    def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> str:
+        return _source_text(messages)
+
+
+class DictionaryBackend(TranslationBackend):
+    """本地词典后端：整段命中词典时返回对应译文，否则原样返回"""
+
+    cacheable = False
+
+    def __init__(self, mapping: Dict[str, str], weight: float = 1.0, name: str = 'dictionary'):
+        super().__init__(name, weight)
+        self.mapping = mapping
+
+    def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> str:
+        text = _source_text(messages)
+        return self.mapping.get(text.strip(), text)
+
+
+class _BackendState:
+    __slots__ = ('backend', 'latency', 'failures', 'ejected_until', 'requests', 'errors')
+
+    def __init__(self, backend: TranslationBackend):
+        self.backend = backend
+        self.latency = None  # 指数加权平均延迟（秒）
+        self.failures = 0  # 连续失败次数
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+
+class BackendRouter:
+    """按权重和实测延迟分发请求，连续失败的后端会被暂时摘除
+
+    listener 会收到每次后端请求的 (延迟, 异常或None)，用于并发控制等外部统计。
+    """
+
+    def __init__(self, backends: List[TranslationBackend], eject_after: int = 3, eject_seconds: float = 30,
+                 latency_alpha: float = 0.3,
+                 listener: Optional[Callable[[float, Optional[Exception]], None]] = None):
+        if not backends:
+            raise ValueError("至少需要配置一个翻译后端")
+        self._states = [_BackendState(b) for b in backends]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.latency_alpha = latency_alpha
+        self.listener = listener
+        self._lock = threading.Lock()
+
+    def _choose(self, exclude) -> _BackendState:
+        now = time.monotonic()
+        with self._lock:
+            states = [s for s in self._states if s not in exclude]
+            healthy = [s for s in states if s.ejected_until <= now]
+            if not healthy:
+                # 全部被摘除时，选择最早恢复的后端继续尝试
+                return min(states, key=lambda s: s.ejected_until)
+            known = [s.latency for s in healthy if s.latency is not None]
+            default_latency = sum(known) / len(known) if known else 1.0
+            scores = [s.backend.weight / max(s.latency if s.latency is not None else default_latency, 1e-3)
+                      for s in healthy]
+            return random.choices(healthy, weights=scores)[0]
+
+    def _record(self, state: _BackendState, latency: float, ok: bool):
+        with self._lock:
+            state.requests += 1
+            if ok:
+                state.failures = 0
+                if state.latency is None:
+                    state.latency = latency
+                else:
+                    state.latency += self.latency_alpha * (latency - state.latency)
+            else:
+                state.errors += 1
+                state.failures += 1
+                if state.failures >= self.eject_after:
+                    state.ejected_until = time.monotonic() + self.eject_seconds
+                    state.failures = 0
+
+    def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> str:
+        """选择后端发送请求，失败时依次换用其他后端重试"""
+        return self.route(messages, max_tokens=max_tokens, temperature=temperature)[1]
+
+    def route(self, messages: List[dict], max_tokens: int = 1000,
+              temperature: float = 0.3) -> Tuple[TranslationBackend, str]:
+        """同 complete，但同时返回实际完成请求的后端"""
+        tried = []
+        last_error = None
+        for _ in range(len(self._states)):
+            state = self._choose(tried)
+            tried.append(state)
+            start = time.monotonic()
+            try:
+                result = state.backend.complete(messages, max_tokens=max_tokens, temperature=temperature)
+            except Exception as e:
+                self._record(state, time.monotonic() - start, False)
+                if self.listener:
+                    self.listener(time.monotonic() - start, e)
+                last_error = e
+                continue
+            latency = time.monotonic() - start
+            self._record(state, latency, True)
+            if self.listener:
+                self.listener(latency, None)
+            return state.backend, result
+        raise last_error
+
+    def stats(self) -> List[dict]:
+        """各后端的请求数、错误数、平均延迟和摘除状态"""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'name': s.backend.name,
+                'weight': s.backend.weight,
+                'requests': s.requests,
+                'errors': s.errors,
+                'latency': s.latency,
+                'ejected': s.ejected_until > now,
+            } for s in self._states]
+
+
+def _build_backend(entry: dict, session) -> TranslationBackend:
+    kind = entry.get('type', 'openai')
+    weight = float(entry.get('weight', 1.0))
+    if kind == 'openai':
+        api_key = entry.get('api_key') or os.getenv(entry.get('api_key_env', 'DEEPSEEK_API_KEY'))
+        return OpenAICompatibleBackend(
+            entry.get('api_url', DEFAULT_API_URL),
+            api_key,
+            entry.get('model', DEFAULT_MODEL),
+            weight=weight,
+            session=session,
+            timeout=float(entry.get('timeout', 120)),
+            name=entry.get('name')
+        )
+    if kind == 'echo':
+        return EchoBackend(weight=weight)
+    if kind == 'dictionary':
+        with open(entry['path'], 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        return DictionaryBackend(mapping, weight=weight)
+    raise ValueError(f"未知的翻译后端类型：{kind}")
+
+
+def _read_backend_config() -> Optional[list]:
+    raw = os.getenv('TRANSLATION_BACKENDS')
+    if raw:
+        return json.loads(raw)
+    path = os.getenv('TRANSLATION_BACKENDS_FILE')
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+
+def backends_configured() -> bool:
+    """是否已配置可用的翻译后端（后端池或默认的 DEEPSEEK_API_KEY）"""
+    return bool(os.getenv('TRANSLATION_BACKENDS') or os.getenv('TRANSLATION_BACKENDS_FILE')
+                or os.getenv('DEEPSEEK_API_KEY'))
+
+
+def backend_identity() -> List[dict]:
+    """当前后端池中影响译文的配置（类型、接口地址、模型等，不含密钥和权重），用于结果缓存键"""
+    config = _read_backend_config()
+    if not config:
+        return [{'type': 'openai', 'api_url': DEFAULT_API_URL, 'model': DEFAULT_MODEL}]
+    identity = []
+    for entry in config:
+        kind = entry.get('type', 'openai')
+        if kind == 'openai':
+            identity.append({'type': kind, 'api_url': entry.get('api_url', DEFAULT_API_URL),
+                             'model': entry.get('model', DEFAULT_MODEL)})
+        elif kind == 'dictionary':
+            identity.append({'type': kind, 'path': entry.get('path')})
+        else:
+            identity.append({'type': kind})
+    return sorted(identity, key=lambda item: json.dumps(item, sort_keys=True))
+
+
+def load_backends(session=None) -> List[TranslationBackend]:
+    """读取后端池配置
+
+    优先使用环境变量 TRANSLATION_BACKENDS（JSON 数组）或 TRANSLATION_BACKENDS_FILE（JSON 文件），
+    每项形如 {"type": "openai", "api_url": ..., "api_key_env": ..., "model": ..., "weight": 2}，
+    type 也可以是 "echo" 或 "dictionary"（需提供 path）。未配置时使用 DEEPSEEK_API_KEY 的单一后端。
+    """
+    config = _read_backend_config()
+    if not config:
+        return [OpenAICompatibleBackend(DEFAULT_API_URL, os.getenv('DEEPSEEK_API_KEY'), DEFAULT_MODEL,
+                                        session=session)]
+    return [_build_backend(entry, session) for entry in config]
@@ -0,0 +1,278 @@
+import os
+import re
+import json
+import struct
+import difflib
+import threading
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# 空分桶的占位值，以及打散 crc32 结果所用的乘法常数
+_EMPTY_BIN = (1 << 32) - 1
+_MIX = 2654435761
+
+# 签名旁路文件：文件头 + 每行记录一项 [原文校验和, 签名...]，启动时免去重新计算签名
+_SIG_MAGIC = b'TMS1'
+_SIG_HEADER = struct.Struct('<4sII')
+
+# 比对用的词元：连续的 ASCII 字母数字为一个词，其余非空白字符（如汉字）各为一个词
+_TOKEN_RE = re.compile(r'[A-Za-z0-9_]+|\S')
+
+
+def _token_ratio(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, _TOKEN_RE.findall(a), _TOKEN_RE.findall(b), autojunk=False).ratio()
+
+
+class TranslationMemory:
+    """基于 MinHash/LSH 的翻译记忆库，用于复用历史版本中近似重复段落的译文
+
+    只有合并空白后完全相同（区分大小写）的原文（exact）才直接复用译文；近似段落（lookup）先用忽略大小写的
+    MinHash 筛选候选，再按词逐一比对打分，只作为“修改参考译文”的依据，避免一词之差的段落直接套用旧译文。
+    """
+
+    def __init__(self, path: Optional[str] = None, num_perm: int = 32, bands: int = 8, ngram: int = 3,
+                 low_threshold: float = 0.7, max_candidates: int = 64, max_compare: int = 8):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._empty_band = array('I', [_EMPTY_BIN] * self.rows).tobytes()
+        self.ngram = ngram
+        self.low_threshold = low_threshold
+        self.max_candidates = max_candidates
+        self.max_compare = max_compare
+
+        self._lock = threading.Lock()
+        self._sources: List[str] = []
+        self._targets: List[str] = []
+        self._langs: List[str] = []
+        # 所有签名平铺存储在一个数组中，第 i 条记录占 [i*num_perm, (i+1)*num_perm)
+        self._signatures = array('I')
+        self._exact: Dict[Tuple[str, str], int] = {}
+        # LSH 分桶：键由语言、分段序号和分段签名计算（见 _band_keys）
+        self._buckets: Dict[int, List[int]] = {}
+
+        self._sig_path = path + '.sig' if path else None
+        if self.path:
+            self._load()
+
+    def __len__(self):
+        return len(self._sources)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """直接复用的键只合并空白、保留大小写（"US"/"us"、"May"/"may" 的译文可能不同）"""
+        return ' '.join(text.split())
+
+    @staticmethod
+    def _checksum(lang: str, normalized: str) -> int:
+        return zlib.crc32(f"{lang}\0{normalized}".encode('utf-8'))
+
+    def _signature(self, normalized: str) -> List[int]:
+        """计算字符 n-gram 集合的单排列 MinHash 签名（一次遍历，按哈希值分桶取最小），忽略大小写"""
+        normalized = normalized.lower()
+        n = self.ngram
+        if len(normalized) <= n:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + n] for i in range(len(normalized) - n + 1)}
+        k = self.num_perm
+        signature = [_EMPTY_BIN] * k
+        for s in shingles:
+            h = (zlib.crc32(s.encode('utf-8')) * _MIX) & 0xFFFFFFFF
+            b, v = h % k, h // k
+            if v < signature[b]:
+                signature[b] = v
+        return signature
+
+    @staticmethod
+    def _similarity(a, b) -> float:
+        """估计 Jaccard 相似度，双方均为空的分桶不参与计算"""
+        equal = total = 0
+        for x, y in zip(a, b):
+            if x == _EMPTY_BIN and y == _EMPTY_BIN:
+                continue
+            total += 1
+            if x == y:
+                equal += 1
+        return equal / total if total else 0.0
+
+    def _band_keys(self, lang: str, signature) -> List[int]:
+        """各分段的分桶键：分段签名字节的 crc32（以语言为种子）加分段序号
+
+        全部为空分桶的分段跳过，否则所有短文本都会挤进同一个桶。
+        """
+        raw = (signature if isinstance(signature, array) else array('I', signature)).tobytes()
+        step = self.rows * 4
+        empty = self._empty_band
+        seed = zlib.crc32(lang.encode('utf-8'))
+        bands = self.bands
+        keys = []
+        for i in range(bands):
+            band = raw[i * step:(i + 1) * step]
+            if band != empty:
+                keys.append(zlib.crc32(band, seed) * bands + i)
+        return keys
+
+    def _insert(self, source: str, target: str, lang: str, normalized: str, signature=None):
+        """写入索引，返回该原文的签名"""
+        key = (lang, normalized)
+        k = self.num_perm
+        if key in self._exact:
+            # 同一原文以最新译文为准
+            idx = self._exact[key]
+            self._targets[idx] = target
+            return self._signatures[idx * k:(idx + 1) * k]
+        if signature is None:
+            signature = self._signature(normalized)
+        idx = len(self._sources)
+        self._sources.append(source)
+        self._targets.append(target)
+        self._langs.append(lang)
+        self._signatures.extend(signature)
+        self._exact[key] = idx
+        for band_key in self._band_keys(lang, signature):
+            self._buckets.setdefault(band_key, []).append(idx)
+        return signature
+
+    def add(self, source: str, target: str, lang: str):
+        """写入一条原文-译文记录，并追加到持久化文件及签名旁路文件"""
+        if not source.strip() or not target.strip():
+            return
+        normalized = self._normalize(source)
+        with self._lock:
+            signature = self._insert(source, target, lang, normalized)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'source': source, 'target': target, 'lang': lang}, ensure_ascii=False) + '\n')
+                entry = array('I', [self._checksum(lang, normalized)])
+                entry.extend(signature)
+                with open(self._sig_path, 'ab') as f:
+                    if f.tell() == 0:
+                        f.write(_SIG_HEADER.pack(_SIG_MAGIC, self.num_perm, self.ngram))
+                    f.write(entry.tobytes())
+
+    def exact(self, text: str, lang: str) -> Optional[str]:
+        """规范化后完全相同的历史原文的译文，没有时返回 None"""
+        normalized = self._normalize(text)
+        if not normalized:
+            return None
+        with self._lock:
+            idx = self._exact.get((lang, normalized))
+            return self._targets[idx] if idx is not None else None
+
+    def lookup(self, text: str, lang: str) -> Optional[Tuple[float, str, str]]:
+        """查找最相似的历史段落，返回 (按词比对的相似度, 历史原文, 历史译文)，低于下限时返回 None
+
+        完全相同的原文相似度为 1.0；近似段落的分数来自 difflib 逐词比对，而非 MinHash 估计值。
+        """
+        normalized = self._normalize(text)
+        if not normalized:
+            return None
+        with self._lock:
+            idx = self._exact.get((lang, normalized))
+            if idx is not None:
+                return 1.0, self._sources[idx], self._targets[idx]
+            if not self._sources:
+                return None
+
+            signature = self._signature(normalized)
+            # 从最新的记录开始收集候选，达到上限立即停止
+            candidates = []
+            seen = set()
+            for band_key in self._band_keys(lang, signature):
+                for idx in reversed(self._buckets.get(band_key, ())):
+                    if idx in seen:
+                        continue
+                    seen.add(idx)
+                    candidates.append(idx)
+                    if len(candidates) >= self.max_candidates:
+                        break
+                if len(candidates) >= self.max_candidates:
+                    break
+
+            # MinHash 只用于粗筛，阈值放宽以免漏掉真正相近的段落
+            k = self.num_perm
+            screen = self.low_threshold - 0.1
+            scored = []
+            for idx in candidates:
+                if self._langs[idx] != lang:
+                    continue
+                score = self._similarity(signature, self._signatures[idx * k:(idx + 1) * k])
+                if score >= screen:
+                    scored.append((score, idx))
+            scored.sort(reverse=True)
+            sources = [(idx, self._sources[idx], self._targets[idx]) for _, idx in scored[:self.max_compare]]
+
+        best = None
+        for idx, source, target in sources:
+            ratio = _token_ratio(normalized.lower(), self._normalize(source).lower())
+            if ratio >= self.low_threshold and (best is None or ratio > best[0]):
+                best = (ratio, source, target)
+        return best
+
+    def _read_sidecar(self) -> Tuple[bool, array]:
+        """读取签名旁路文件；参数不一致或文件损坏时返回 (False, 空数组)"""
+        stored = array('I')
+        if not os.path.exists(self._sig_path):
+            return False, stored
+        with open(self._sig_path, 'rb') as f:
+            header = f.read(_SIG_HEADER.size)
+            if len(header) < _SIG_HEADER.size or _SIG_HEADER.unpack(header) != (_SIG_MAGIC, self.num_perm, self.ngram):
+                return False, stored
+            data = f.read()
+        data = data[:len(data) - len(data) % (4 * (self.num_perm + 1))]
+        stored.frombytes(data)
+        return True, stored
+
+    def _write_sidecar(self, header_ok: bool, aligned: int, tail: array):
+        """保留前 aligned 项与记录一致的签名，其后替换为重新计算的签名"""
+        if header_ok:
+            with open(self._sig_path, 'r+b') as f:
+                f.truncate(_SIG_HEADER.size + aligned * (self.num_perm + 1) * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(tail.tobytes())
+        else:
+            with open(self._sig_path, 'wb') as f:
+                f.write(_SIG_HEADER.pack(_SIG_MAGIC, self.num_perm, self.ngram))
+                f.write(tail.tobytes())
+
+    def _load(self):
+        """从持久化文件重建索引，签名优先从旁路文件读取"""
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        if not os.path.exists(self.path):
+            return
+        header_ok, stored = self._read_sidecar()
+        width = self.num_perm + 1
+        total = len(stored) // width
+        aligned = 0
+        mismatched = False
+        tail = array('I')
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    source, target, lang = record['source'], record['target'], record['lang']
+                except (ValueError, KeyError):
+                    # 忽略写入中断导致的残缺行
+                    continue
+                normalized = self._normalize(source)
+                check = self._checksum(lang, normalized)
+                if not mismatched and aligned < total and stored[aligned * width] == check:
+                    signature = stored[aligned * width + 1:(aligned + 1) * width]
+                    aligned += 1
+                else:
+                    # 旁路文件缺项或与记录错位：此后的签名全部重新计算并写回
+                    mismatched = True
+                    signature = None
+                signature = self._insert(source, target, lang, normalized, signature)
+                if mismatched:
+                    tail.append(check)
+                    tail.extend(signature)
+        if tail or aligned < total or not header_ok:
+            self._write_sidecar(header_ok, aligned, tail)